@@ -0,0 +1,316 @@
+"""Request metrics in Prometheus text format.
+
+`MetricsMiddleware` counts requests and records latency histograms per route
+template (`/batches/{batch_id}`, not the raw path). The template is looked up
+from the endpoint Starlette stores in the scope after routing, so recording
+costs a dict lookup and a bisect per request rather than a second route match.
+In-flight gauges are kept by `InstrumentedRoute`, which routers use as their
+`route_class`, because only the route knows its template before it runs.
+
+The middleware also binds a `QueryStats` per request: the SQL
+statement count and time go out in a Server-Timing header, into per-route
+counters, and into a warning log for requests running more than
+SQL_QUERY_WARN_THRESHOLD statements.
+
+`render_metrics` adds DB pool checkouts, threadpool usage, the password
+hashing queue and process RSS, and renders everything for GET /metrics.
+"""
+
+import logging
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from database.profiling import QueryStats, current_queries
+
+try:
+    import psutil
+except ImportError:  # optional dependency
+    psutil = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "unmatched"
+# Requests running more SQL statements than this are logged as warnings.
+SQL_QUERY_WARN_THRESHOLD = int(os.getenv("SQL_QUERY_WARN_THRESHOLD", "20"))
+
+logger = logging.getLogger(__name__)
+
+
+class RouteStats:
+    __slots__ = (
+        "counts", "buckets", "total_seconds", "in_flight", "queries", "query_seconds"
+    )
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.buckets: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total_seconds = 0.0
+        self.in_flight = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+class MetricsRegistry:
+    """Per-(method, route) request stats plus database pool counters."""
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.pool_checkouts: Dict[str, int] = {}
+        self.pool_checked_out: Dict[str, int] = {}
+
+    def stats(self, method: str, route: str) -> RouteStats:
+        key = (method, route)
+        stats = self.routes.get(key)
+        if stats is None:
+            stats = self.routes[key] = RouteStats()
+        return stats
+
+    def observe(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        seconds: float,
+        queries: int = 0,
+        query_seconds: float = 0.0,
+    ) -> None:
+        stats = self.stats(method, route)
+        stats.counts[status] = stats.counts.get(status, 0) + 1
+        stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        stats.total_seconds += seconds
+        stats.queries += queries
+        stats.query_seconds += query_seconds
+
+    def instrument_pool(self, engine: Engine, name: str) -> None:
+        """Count connection checkouts and currently checked-out connections."""
+        self.pool_checkouts[name] = 0
+        self.pool_checked_out[name] = 0
+
+        @event.listens_for(engine, "checkout")
+        def _checkout(dbapi_connection, connection_record, connection_proxy):
+            self.pool_checkouts[name] += 1
+            self.pool_checked_out[name] += 1
+
+        @event.listens_for(engine, "checkin")
+        def _checkin(dbapi_connection, connection_record):
+            self.pool_checked_out[name] -= 1
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts and latency per route template."""
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry = registry):
+        self.app = app
+        self.registry = registry
+        self.templates: Dict[Callable, str] = {}
+
+    def _template(self, scope: Scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        template = self.templates.get(endpoint)
+        if template is None:
+            self.templates = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+            template = self.templates.get(endpoint, UNMATCHED_ROUTE)
+        return template
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+        queries = QueryStats()
+        token = current_queries.set(queries)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"server-timing", queries.server_timing().encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_queries.reset(token)
+            route = self._template(scope)
+            self.registry.observe(
+                scope["method"],
+                route,
+                status,
+                time.perf_counter() - start,
+                queries.count,
+                queries.seconds,
+            )
+            if queries.count > SQL_QUERY_WARN_THRESHOLD:
+                logger.warning(
+                    "%s %s ran %d SQL statements (%.1f ms)",
+                    scope["method"],
+                    route,
+                    queries.count,
+                    queries.seconds * 1000,
+                )
+
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute that keeps an in-flight gauge for its template while it runs."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        path = self.path
+
+        async def instrumented_handler(request):
+            stats = registry.stats(request.method, path)
+            stats.in_flight += 1
+            try:
+                return await handler(request)
+            finally:
+                stats.in_flight -= 1
+
+        return instrumented_handler
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _threadpool_usage() -> Optional[Tuple[float, float]]:
+    """(borrowed, total) tokens of anyio's default thread limiter, if in a loop."""
+    try:
+        from anyio.to_thread import current_default_thread_limiter
+
+        limiter = current_default_thread_limiter()
+    except Exception:
+        return None
+    return limiter.borrowed_tokens, limiter.total_tokens
+
+
+def _process_rss() -> Optional[int]:
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        import resource
+
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (ImportError, OSError, ValueError, IndexError):
+        return None
+
+
+def render_metrics(
+    registry: MetricsRegistry = registry, extra: Dict[str, Tuple[str, float]] = None
+) -> str:
+    """Render all metrics in the Prometheus text exposition format (0.0.4).
+
+    `extra` maps further metric names to (type, value), e.g. ("gauge", 3).
+    """
+    lines: List[str] = []
+
+    lines += [
+        "# HELP http_requests_total Requests by method, route template and status.",
+        "# TYPE http_requests_total counter",
+    ]
+    for (method, route), stats in sorted(registry.routes.items()):
+        for status, count in sorted(stats.counts.items()):
+            lines.append(
+                f"http_requests_total{_labels(method=method, route=route, status=status)} {count}"
+            )
+
+    lines += [
+        "# HELP http_request_duration_seconds Request latency by method and route template.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route), stats in sorted(registry.routes.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), stats.buckets):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            labels = _labels(method=method, route=route, le=le)
+            lines.append(f"http_request_duration_seconds_bucket{labels} {cumulative}")
+        labels = _labels(method=method, route=route)
+        lines.append(f"http_request_duration_seconds_sum{labels} {stats.total_seconds}")
+        lines.append(f"http_request_duration_seconds_count{labels} {cumulative}")
+
+    lines += [
+        "# HELP http_requests_in_progress Requests currently being handled by route template.",
+        "# TYPE http_requests_in_progress gauge",
+    ]
+    for (method, route), stats in sorted(registry.routes.items()):
+        if route != UNMATCHED_ROUTE:
+            labels = _labels(method=method, route=route)
+            lines.append(f"http_requests_in_progress{labels} {stats.in_flight}")
+
+    lines += [
+        "# HELP db_queries_total SQL statements executed by route template.",
+        "# TYPE db_queries_total counter",
+    ]
+    for (method, route), stats in sorted(registry.routes.items()):
+        labels = _labels(method=method, route=route)
+        lines.append(f"db_queries_total{labels} {stats.queries}")
+    lines += [
+        "# HELP db_query_seconds_total Time spent executing SQL by route template.",
+        "# TYPE db_query_seconds_total counter",
+    ]
+    for (method, route), stats in sorted(registry.routes.items()):
+        labels = _labels(method=method, route=route)
+        lines.append(f"db_query_seconds_total{labels} {stats.query_seconds}")
+
+    lines += [
+        "# HELP db_pool_checkouts_total Connections checked out of the pool.",
+        "# TYPE db_pool_checkouts_total counter",
+    ]
+    for name, count in sorted(registry.pool_checkouts.items()):
+        lines.append(f"db_pool_checkouts_total{_labels(engine=name)} {count}")
+    lines += [
+        "# HELP db_pool_checked_out Connections currently checked out of the pool.",
+        "# TYPE db_pool_checked_out gauge",
+    ]
+    for name, count in sorted(registry.pool_checked_out.items()):
+        lines.append(f"db_pool_checked_out{_labels(engine=name)} {count}")
+
+    usage = _threadpool_usage()
+    if usage is not None:
+        borrowed, total = usage
+        lines += [
+            "# HELP threadpool_borrowed_tokens Worker threads in use by the default anyio limiter.",
+            "# TYPE threadpool_borrowed_tokens gauge",
+            f"threadpool_borrowed_tokens {borrowed}",
+            "# HELP threadpool_total_tokens Size of the default anyio thread limiter.",
+            "# TYPE threadpool_total_tokens gauge",
+            f"threadpool_total_tokens {total}",
+        ]
+
+    rss = _process_rss()
+    if rss is not None:
+        lines += [
+            "# HELP process_resident_memory_bytes Resident set size of this process.",
+            "# TYPE process_resident_memory_bytes gauge",
+            f"process_resident_memory_bytes {rss}",
+        ]
+
+    for name, (kind, value) in sorted((extra or {}).items()):
+        lines += [f"# TYPE {name} {kind}", f"{name} {value}"]
+
+    return "\n".join(lines) + "\n"
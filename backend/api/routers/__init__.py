@@ -3,5 +3,7 @@
 from . import batches
 from . import auth
 from . import users
+from . import diagnostics
+from . import metrics
 
-__all__ = ["batches", "auth", "users"]
+__all__ = ["batches", "auth", "users", "diagnostics", "metrics"]
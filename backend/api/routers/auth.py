@@ -1,30 +1,44 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from schemas.user import LoginRequest, LoginResponse, RegisterRequest, RegisterResponse, UserResponse
 from controllers.auth import AuthController
+from passwords import HasherBusyError
+from api.metrics import InstrumentedRoute
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=InstrumentedRoute)
+
+
+def _hasher_busy(e: HasherBusyError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": "1"},
+    )
 
 
 @router.post("/register", response_model=RegisterResponse)
-def register(request: RegisterRequest, db: Session = Depends(get_db)):
+async def register(request: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
     """Register a new user."""
     try:
-        token, user = AuthController.register_user(db, request)
+        token, user = await AuthController.register_user(db, request)
         return {"access_token": token, "user": user}
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except HasherBusyError as e:
+        raise _hasher_busy(e)
 
 
 @router.post("/login", response_model=LoginResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """Login with email and password."""
     try:
-        token, user = AuthController.login_user(db, request.email, request.password)
+        token, user = await AuthController.login_user(db, request.email, request.password)
         return {"access_token": token, "user": user}
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=str(e),
         )
+    except HasherBusyError as e:
+        raise _hasher_busy(e)
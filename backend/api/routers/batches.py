@@ -1,39 +1,332 @@
 """API routers for Freshness Tracker endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from sqlalchemy.orm import Session
-from datetime import date, datetime
+import hashlib
+import os
 
-from schemas import Batch, BatchCreate, BatchWithFreshness
-from database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+
+from schemas import (
+    Batch,
+    BatchChangesResponse,
+    BatchCreate,
+    BatchWithFreshness,
+    BulkBatchResponse,
+    FreshnessStatsResponse,
+)
+from database import AsyncSessionLocal, get_async_db
 from controllers import batches as batches_controller
+from api.metrics import InstrumentedRoute
+from api.serialization import TrustedSerializer, default_response_class, fast_json_enabled
+
+router = APIRouter(
+    prefix="/batches",
+    tags=["batches"],
+    default_response_class=default_response_class("batches"),
+    route_class=InstrumentedRoute,
+)
+
+# Serialize ORM rows straight to JSON bytes instead of FastAPI's default
+# validate + jsonable_encoder + json.dumps path (see api/serialization.py).
+FAST_JSON = fast_json_enabled("batches")
+batch_list_json = TrustedSerializer(List[Batch])
+freshness_list_json = TrustedSerializer(List[BatchWithFreshness])
+freshness_json = TrustedSerializer(BatchWithFreshness)
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+BULK_MAX_BATCHES = int(os.getenv("BULK_MAX_BATCHES", "10000"))
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+CHANGES_MAX_LIMIT = int(os.getenv("BATCH_CHANGES_MAX_LIMIT", "1000"))
+PAGE_MAX_LIMIT = int(os.getenv("BATCH_PAGE_MAX_LIMIT", "1000"))
+SEARCH_MAX_LIMIT = 100
+# Idle event streams get a comment line this often, so proxies keep them open.
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("BATCH_EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_RETRY_MS = 3000
+
+# Representations depend on the clock (days_on_shelf), so clients must revalidate.
+ETAG_CACHE_CONTROL = "no-cache"
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", batches_controller.export_batches_ndjson),
+    "csv": ("text/csv", batches_controller.export_batches_csv),
+}
+
+
+def _database_busy(e: batches_controller.DatabaseBusyError) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+def _etag(*parts) -> str:
+    """Build a weak ETag from the values that determine a representation.
+
+    Weak because compression may change the bytes while the representation
+    stays the same; the 200, compressed or not, and the 304 carry one value.
+    """
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16)
+    return f'W/"{digest.hexdigest()}"'
+
 
-router = APIRouter(prefix="/batches", tags=["batches"])
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    opaque = etag.removeprefix("W/")
+    return "*" in candidates or any(
+        tag.removeprefix("W/") == opaque for tag in candidates
+    )
+
+
+def _conditional(
+    response: Response, if_none_match: Optional[str], etag: str
+) -> Optional[Response]:
+    """Set the ETag on `response`; return a 304 to send instead if it matches."""
+    headers = {"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def _render(serializer: TrustedSerializer, content, response: Response):
+    """Return `content` via the fast path if enabled, keeping `response`'s headers."""
+    if not FAST_JSON:
+        return content
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return serializer.response(content, headers)
 
 
 @router.post("/", response_model=Batch)
-def create_batch(batch: BatchCreate, db: Session = Depends(get_db)):
+async def create_batch(batch: BatchCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new batch of products."""
-    return batches_controller.create_batch(db, batch)
+    try:
+        return await batches_controller.create_batch(db, batch)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except batches_controller.DatabaseBusyError as e:
+        raise _database_busy(e)
+
+
+@router.post("/bulk", response_model=BulkBatchResponse)
+async def bulk_create_batches(
+    batches: List[BatchCreate], db: AsyncSession = Depends(get_async_db)
+):
+    """Create many batches in one transaction, reporting a result per row."""
+    if len(batches) > BULK_MAX_BATCHES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {BULK_MAX_BATCHES} batches per request",
+        )
+    try:
+        results = await batches_controller.bulk_create_batches(db, batches)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except batches_controller.DatabaseBusyError as e:
+        raise _database_busy(e)
+    created = sum(1 for r in results if r["status"] == "created")
+    return {"created": created, "conflicts": len(results) - created, "results": results}
 
 
 @router.get("/", response_model=List[Batch])
-def get_batches(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all batches with optional pagination."""
-    return batches_controller.get_batches(db, skip, limit)
+async def get_batches(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    arrived_since: Optional[date] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get all batches with optional pagination.
+
+    Pass `cursor` (empty for the first page) to use keyset pagination instead
+    of `skip`; the cursor for the following page is returned in the
+    `X-Next-Cursor` response header, which is absent on the last page.
+    `arrived_since` limits the results to batches that arrived on or after
+    that date. The response carries an ETag over the page's row versions;
+    a matching `If-None-Match` gets 304.
+    """
+    next_cursor = None
+    if cursor is None:
+        rows = await batches_controller.get_batches(db, skip, limit, arrived_since)
+    else:
+        try:
+            rows, next_cursor = await batches_controller.get_batches_after(
+                db, cursor, limit, arrived_since
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    etag = _etag(next_cursor, [(row.id, row.version) for row in rows])
+    not_modified = _conditional(response, if_none_match, etag)
+    if not_modified is not None:
+        if next_cursor:
+            not_modified.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return not_modified
+    return _render(batch_list_json, rows, response)
+
+
+@router.get("/freshness", response_model=List[BatchWithFreshness])
+async def get_batches_freshness(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=PAGE_MAX_LIMIT),
+    min_days: Optional[int] = Query(None, ge=0),
+    max_days: Optional[int] = Query(None, ge=0),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get batches with days on shelf computed in SQL, filtered and sorted by it.
+
+    `min_days`/`max_days` bound days on shelf (inclusive); `order=desc` lists
+    the oldest stock first.
+    """
+    rows = await batches_controller.get_batches_with_freshness(
+        db, skip, limit, min_days, max_days, order
+    )
+    return _render(freshness_list_json, rows, response)
+
+
+@router.get("/stats", response_model=FreshnessStatsResponse)
+async def get_batch_stats(db: AsyncSession = Depends(get_async_db)):
+    """Per product: batch count, min/avg/max days on shelf, and how many batches
+    are fresh, aging or expired. Aggregated in one SQL query."""
+    products = await batches_controller.get_product_freshness_stats(db, date.today())
+    return {
+        "fresh_max_days": batches_controller.FRESH_MAX_DAYS,
+        "aging_max_days": batches_controller.AGING_MAX_DAYS,
+        "products": products,
+    }
+
+
+@router.get("/search", response_model=List[Batch])
+async def search_batches(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Search batches by product and identifier, best matches first.
+
+    Every word in `q` must start a word of the product or identifier, so
+    partial input works: `q=rib` finds "Beef Ribeye", `q=SYN-00012` finds
+    identifiers beginning with it.
+    """
+    rows = await batches_controller.search_batches(db, q, limit)
+    return _render(batch_list_json, rows, response)
+
+
+@router.get("/export")
+async def export_batches(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """Stream every batch as NDJSON or CSV without loading the table into memory."""
+    media_type, exporter = EXPORT_FORMATS[format]
+
+    async def stream() -> AsyncIterator[str]:
+        # The stream outlives the request handler, so it owns its session.
+        async with AsyncSessionLocal() as db:
+            async for chunk in exporter(db, EXPORT_CHUNK_SIZE):
+                yield chunk
+
+    headers = {"Content-Disposition": f'attachment; filename="batches.{format}"'}
+    return StreamingResponse(stream(), media_type=media_type, headers=headers)
+
+
+@router.get("/changes", response_model=BatchChangesResponse)
+async def get_batch_changes(
+    since: str = "",
+    limit: int = Query(500, ge=1),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Delta sync: batches created, edited or deleted after the `since` token.
+
+    Start with an empty `since` for a full sync, then pass back `next` to get
+    only what changed since. Changes come in sequence order as `upsert` (with
+    the current batch) or `delete` (a tombstone); while `has_more` is true,
+    call again with `next` straight away. Returns 501 unless the database is
+    SQLite (see `batches_controller.get_changes`).
+    """
+    try:
+        changes, next_token, has_more = await batches_controller.get_changes(
+            db, since, min(limit, CHANGES_MAX_LIMIT)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except batches_controller.DeltaSyncUnsupportedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return {"changes": changes, "next": next_token, "has_more": has_more}
+
+
+@router.get("/stream")
+async def stream_batch_events(last_event_id: Optional[str] = Header(None)):
+    """Server-Sent Events of batch changes, so displays apply deltas instead of reloading.
+
+    Events: `created` (data: a list of batches, as in GET /batches/),
+    `deleted` (data: a list of `{id, batch_identifier}`), `expired` (data: a
+    list of expiry alerts for batches that just passed their shelf life) and
+    `reset` (reload the list; sent when a client fell too far behind or
+    reconnects with a Last-Event-ID that can no longer be replayed, including
+    one issued by another worker or before a restart).
+    """
+    broker = batches_controller.batch_events
+    if broker.subscribers >= broker.max_subscribers:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many event stream clients, try again shortly",
+            headers={"Retry-After": "5"},
+        )
+
+    async def stream() -> AsyncIterator[bytes]:
+        # Subscribe inside the stream so the finally below always unsubscribes.
+        subscriber = broker.subscribe(last_event_id)
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\n\n".encode("ascii")
+            async for frame in subscriber.frames(EVENTS_HEARTBEAT_SECONDS):
+                yield frame
+        finally:
+            broker.unsubscribe(subscriber)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=headers)
 
 
 @router.get("/{batch_id}", response_model=BatchWithFreshness)
-def get_batch(batch_id: int, db: Session = Depends(get_db)):
-    """Get a specific batch by ID with freshness information."""
-    db_batch = batches_controller.get_batch(db, batch_id)
-    if db_batch is None:
-        raise HTTPException(status_code=404, detail="Batch not found")
+async def get_batch(
+    batch_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get a specific batch by ID with freshness information.
 
-    # Calculate days on shelf
+    The ETag covers the row version and today's date, so it changes when the
+    batch is edited or `days_on_shelf` ticks over; a matching `If-None-Match`
+    gets 304 without building the body.
+    """
     today = date.today()
-    arrival_date = datetime.strptime(db_batch.arrival_date, "%Y-%m-%d").date()
-    days_on_shelf = (today - arrival_date).days
+    row = await batches_controller.get_batch_freshness(db, batch_id, today)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    etag = _etag(row.id, row.version, today.toordinal())
+    not_modified = _conditional(response, if_none_match, etag)
+    if not_modified is not None:
+        return not_modified
+
+    return _render(freshness_json, row, response)
 
-    return {**db_batch.__dict__, "days_on_shelf": days_on_shelf}
+
+@router.delete("/{batch_id}", status_code=204)
+async def delete_batch(batch_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete a batch; delta-sync clients see it as a `delete` change."""
+    try:
+        deleted = await batches_controller.delete_batch(db, batch_id)
+    except batches_controller.DatabaseBusyError as e:
+        raise _database_busy(e)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return Response(status_code=204)
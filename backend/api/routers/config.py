@@ -8,7 +8,9 @@ Windows/WSL.
 import os
 from fastapi import APIRouter
 
-router = APIRouter(prefix="/config", tags=["config"])
+from api.metrics import InstrumentedRoute
+
+router = APIRouter(prefix="/config", tags=["config"], route_class=InstrumentedRoute)
 
 
 @router.get("/public")
@@ -0,0 +1,59 @@
+"""Diagnostics endpoints for inspecting the running backend."""
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.metrics import InstrumentedRoute
+from controllers import batches as batches_controller
+from database import SQLITE_PRAGMAS, get_async_db
+from database.sqlite import SQLITE_PRAGMA_SETTINGS
+from passwords import password_hasher
+
+router = APIRouter(prefix="/diagnostics", tags=["diagnostics"], route_class=InstrumentedRoute)
+
+
+@router.get("/database")
+async def get_database_settings(db: AsyncSession = Depends(get_async_db)):
+    """Report the database dialect and, for SQLite, the configured and live PRAGMAs.
+
+    `active` is read back from the connection serving this request, so it shows
+    what SQLite actually accepted (e.g. journal_mode stays "memory" for
+    in-memory databases even when WAL is configured).
+    """
+    dialect = db.bind.dialect.name
+    if dialect != "sqlite":
+        return {"dialect": dialect}
+
+    active = {}
+    for name in SQLITE_PRAGMA_SETTINGS:
+        result = await db.execute(text(f"PRAGMA {name}"))
+        active[name] = result.scalar()
+    return {"dialect": dialect, "configured": SQLITE_PRAGMAS, "active": active}
+
+
+@router.get("/password-hashing")
+async def get_password_hashing_stats():
+    """Report the password hashing pool's size, queue depth and outcome counters."""
+    return password_hasher.stats()
+
+
+@router.get("/batch-writes")
+async def get_batch_write_stats():
+    """Report group-commit window, size limit and how many creates each commit carried."""
+    queue = batches_controller.batch_write_queue
+    if queue is None:
+        return {"enabled": False}
+    return {"enabled": True, **queue.stats()}
+
+
+@router.get("/batch-events")
+async def get_batch_event_stats():
+    """Report connected event stream clients, published events and slow-client overflows."""
+    return batches_controller.batch_events.stats()
+
+
+@router.get("/expiry-alerts")
+async def get_expiry_alert_stats():
+    """Report scheduled batch expiries, the next deadline and alerts sent."""
+    return batches_controller.expiry_alerts.stats()
@@ -0,0 +1,25 @@
+"""Prometheus scrape endpoint."""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from api.metrics import InstrumentedRoute, render_metrics
+from passwords import password_hasher
+
+router = APIRouter(tags=["metrics"], route_class=InstrumentedRoute)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Request, database pool, threadpool and process metrics for Prometheus."""
+    hasher = password_hasher.stats()
+    extra = {
+        "password_hash_pending": ("gauge", hasher["pending"]),
+        "password_hash_rejected_total": ("counter", hasher["rejected"]),
+        "password_hash_timeouts_total": ("counter", hasher["timeouts"]),
+    }
+    return PlainTextResponse(
+        render_metrics(extra=extra), media_type=PROMETHEUS_CONTENT_TYPE
+    )
@@ -1,16 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Header
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from schemas.user import UserResponse, UserUpdate
-from controllers.auth import AuthController
+from controllers.auth import AuthController, user_cache
+from api.metrics import InstrumentedRoute
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=InstrumentedRoute)
 
 
-def get_current_user(
-    authorization: str = Header(None), db: Session = Depends(get_db)
+async def get_current_user(
+    authorization: str = Header(None), db: AsyncSession = Depends(get_async_db)
 ):
-    """Get current authenticated user from JWT token."""
+    """Get current authenticated user from JWT token.
+
+    Uses the profile carried in the token when present, otherwise the cached
+    profile, and only falls back to the database on a cache miss.
+    """
     if not authorization:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -44,7 +49,9 @@ def get_current_user(
             detail="Invalid token",
         )
 
-    user = AuthController.get_user_by_id(db, user_id)
+    user = AuthController.user_from_claims(payload)
+    if user is None:
+        user = await AuthController.get_cached_user(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -55,23 +62,30 @@ def get_current_user(
 
 
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user=Depends(get_current_user)):
+async def get_me(current_user=Depends(get_current_user)):
     """Get current user information."""
-    return UserResponse.from_orm(current_user)
+    return current_user
 
 
 @router.put("/me", response_model=UserResponse)
-def update_me(
+async def update_me(
     updates: UserUpdate,
     current_user=Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update current user information."""
+    user = await AuthController.get_user_by_id(db, current_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+        )
     if updates.full_name:
-        current_user.full_name = updates.full_name
+        user.full_name = updates.full_name
     if updates.email:
-        current_user.email = updates.email
+        user.email = updates.email
 
-    db.commit()
-    db.refresh(current_user)
-    return UserResponse.from_orm(current_user)
+    await db.commit()
+    await db.refresh(user)
+    user_cache.invalidate(user.id)
+    return UserResponse.from_orm(user)
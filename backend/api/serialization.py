@@ -0,0 +1,92 @@
+"""Fast JSON responses for the API.
+
+FastAPI's default path validates a handler's return value against its
+`response_model`, converts it with `jsonable_encoder` and then runs `json.dumps`.
+For long batch lists that is most of the request time. Routers listed in
+FAST_JSON_ROUTERS instead:
+
+- use orjson (when installed) as their default response class, and
+- serialize trusted ORM rows without validating them: the schema's fields are
+  read straight from each row's loaded state (skipping SQLAlchemy's attribute
+  instrumentation) and encoded by orjson, or pydantic-core without it. Output
+  matches what the `response_model` would produce for well-formed rows.
+"""
+
+import os
+from collections.abc import Mapping
+from operator import attrgetter, itemgetter
+from typing import Any, Dict, List, Optional, Type, get_args, get_origin
+
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+FAST_JSON_ROUTERS = {
+    name.strip()
+    for name in os.getenv("FAST_JSON_ROUTERS", "batches").split(",")
+    if name.strip()
+}
+
+
+def fast_json_enabled(router_name: str) -> bool:
+    """Whether the router should use the fast serialization path."""
+    return "*" in FAST_JSON_ROUTERS or router_name in FAST_JSON_ROUTERS
+
+
+def default_response_class(router_name: str) -> Type[Response]:
+    """orjson-backed responses for fast-path routers, FastAPI's default otherwise."""
+    if fast_json_enabled(router_name) and orjson is not None:
+        return ORJSONResponse
+    return JSONResponse
+
+
+class TrustedSerializer:
+    """Serializes ORM objects or row mappings for a schema straight to JSON bytes.
+
+    `schema` is a flat pydantic model or a `List` of one, e.g. `List[Batch]`.
+    Rows are trusted, not validated: each must already hold every field with
+    the schema's types, as rows loaded through the schema's own columns do.
+    """
+
+    def __init__(self, schema: Any):
+        self.many = get_origin(schema) in (list, List)
+        model = get_args(schema)[0] if self.many else schema
+        if not (isinstance(model, type) and issubclass(model, BaseModel)):
+            raise TypeError(f"TrustedSerializer needs a model or List[model], not {schema!r}")
+        self.fields = tuple(model.model_fields)
+        self._from_attributes = attrgetter(*self.fields)
+        self._from_mapping = itemgetter(*self.fields)
+
+    def _to_dict(self, row: Any) -> dict:
+        if isinstance(row, Mapping):
+            return dict(zip(self.fields, self._from_mapping(row)))
+        try:
+            # A loaded ORM object keeps its column values in __dict__.
+            values = self._from_mapping(vars(row))
+        except (KeyError, TypeError):  # expired attributes, or no __dict__
+            values = self._from_attributes(row)
+        return dict(zip(self.fields, values))
+
+    def dump_json(self, content: Any) -> bytes:
+        if self.many:
+            data = [self._to_dict(row) for row in content]
+        else:
+            data = self._to_dict(content)
+        if orjson is not None:
+            # OPT_UTC_Z writes UTC as "Z", like pydantic does.
+            return orjson.dumps(data, option=orjson.OPT_UTC_Z)
+        return to_json(data)
+
+    def response(
+        self, content: Any, headers: Optional[Dict[str, str]] = None
+    ) -> Response:
+        return Response(
+            content=self.dump_json(content),
+            media_type="application/json",
+            headers=headers,
+        )
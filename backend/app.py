@@ -7,31 +7,27 @@ Behavior:
 - Windows: binds to the Wi‑Fi adapter IPv4 when available, updating HOST in .env.
 - WSL2: binds to 0.0.0.0 and attempts to configure Windows firewall and portproxy
     so phones can reach the API at http://<Windows_WiFi_IP>:<PORT>.
+- SERVER_MODE=production: skips LAN discovery and reload, binds HOST and runs
+    WORKERS processes (default: one per CPU) with uvloop/httptools if installed.
 
 API docs: http://<host>:<port>/docs
 """
 
 import os
-import uvicorn
+import platform
+from importlib.util import find_spec
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
-from database import engine, Base
-from api.routers import batches, auth, users, config
+from database import engine, async_engine, init_database, SQLITE_PRAGMAS
+from api.compression import CompressionMiddleware
+from api.metrics import MetricsMiddleware, registry as metrics_registry
+from api.routers import batches, auth, users, config, diagnostics, metrics
+from controllers import batches as batches_controller
 from models.batch import Batch
 from models.user import User
-import platform
-from lan_ip import (
-    get_lan_ip,
-    update_env_host,
-    get_windows_wifi_ip,
-    update_env_var,
-    ensure_portproxy,
-    ensure_firewall_port,
-    is_wsl as _is_wsl,
-    get_wsl_ip,
-)
+from passwords import password_hasher
 
 # Load environment variables from .env file
 load_dotenv()
@@ -42,6 +38,11 @@ def create_app() -> FastAPI:
     api_title = os.getenv("API_TITLE", "Freshness Tracker API")
     api_version = os.getenv("API_VERSION", "1.0.0")
     cors_origins = os.getenv("CORS_ORIGINS", "*").split(",")
+    compression_encodings = [
+        e.strip()
+        for e in os.getenv("COMPRESSION_ENCODINGS", "br,zstd,gzip").split(",")
+        if e.strip()
+    ]
 
     app = FastAPI(title=api_title, version=api_version)
 
@@ -52,16 +53,47 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[batches.NEXT_CURSOR_HEADER, "ETag", "Server-Timing"],
+    )
+
+    # Response compression (empty COMPRESSION_ENCODINGS disables it)
+    app.add_middleware(
+        CompressionMiddleware,
+        encodings=compression_encodings,
+        minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+        gzip_level=int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+        brotli_quality=int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+        zstd_level=int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3")),
     )
 
+    # Request metrics, added last so it is outermost and times the whole stack
+    if os.getenv("METRICS_ENABLED", "True").lower() == "true":
+        app.add_middleware(MetricsMiddleware)
+        metrics_registry.instrument_pool(engine, "sync")
+        metrics_registry.instrument_pool(async_engine.sync_engine, "async")
+
     # Routers
     app.include_router(auth.router)
     app.include_router(users.router)
     app.include_router(batches.router)
     app.include_router(config.router)
-
-    # Ensure tables exist
-    Base.metadata.create_all(bind=engine)
+    app.include_router(diagnostics.router)
+    app.include_router(metrics.router)
+
+    # Ensure tables exist and bring older databases up to date when the
+    # server starts, not when this module is imported (production mode does
+    # this once before starting workers and turns it off for them)
+    if os.getenv("DATABASE_INIT_ON_STARTUP", "True").lower() == "true":
+        app.add_event_handler("startup", lambda: init_database(engine))
+    # With several workers, relay batches created by the others to this
+    # worker's event streams
+    app.add_event_handler("startup", batches_controller.start_event_tailer)
+    app.add_event_handler("shutdown", batches_controller.stop_event_tailer)
+    # Alert when batches pass their shelf life (EXPIRY_ALERTS=False turns off)
+    app.add_event_handler("startup", batches_controller.start_expiry_alerts)
+    app.add_event_handler("shutdown", batches_controller.stop_expiry_alerts)
+    app.add_event_handler("startup", password_hasher.start)
+    app.add_event_handler("shutdown", password_hasher.shutdown)
 
     return app
 
@@ -69,7 +101,75 @@ def create_app() -> FastAPI:
 app = create_app()
 
 
-if __name__ == "__main__":
+def production_workers() -> int:
+    """WORKERS, or one per usable CPU, capped to 1 where SQLite can't share."""
+    requested = os.getenv("WORKERS")
+    if requested:
+        workers = int(requested)
+    elif hasattr(os, "sched_getaffinity"):
+        workers = len(os.sched_getaffinity(0))
+    else:
+        workers = os.cpu_count() or 1
+
+    if engine.dialect.name == "sqlite" and workers > 1:
+        # Each process would get its own private in-memory database.
+        if engine.url.database in (None, "", ":memory:"):
+            print("[startup] In-memory SQLite is per process; using 1 worker")
+            return 1
+        # WAL lets every worker read while one writes; busy_timeout makes
+        # writers queue for the single write lock instead of failing.
+        if SQLITE_PRAGMAS.get("journal_mode", "").upper() != "WAL":
+            print("[startup] SQLite needs SQLITE_JOURNAL_MODE=WAL for several workers; using 1 worker")
+            return 1
+    return max(1, workers)
+
+
+def serve_production() -> None:
+    """Run reload-free uvicorn workers on HOST:PORT."""
+    import uvicorn
+
+    host = os.getenv("HOST", "0.0.0.0")
+    port = int(os.getenv("PORT", "8000"))
+    workers = production_workers()
+    loop = "uvloop" if find_spec("uvloop") else "asyncio"
+    http = "httptools" if find_spec("httptools") else "h11"
+
+    # Create and migrate the schema once here rather than racing in every
+    # worker; workers inherit the environment and skip it.
+    init_database(engine)
+    os.environ["DATABASE_INIT_ON_STARTUP"] = "False"
+    if workers > 1:
+        # Event streams only see their own worker's writes without this.
+        os.environ.setdefault("BATCH_EVENTS_POLL_SECONDS", "1")
+        # Every worker schedules expiry alerts; one of them logs/posts them.
+        os.environ.setdefault("EXPIRY_ALERTS_LOCK_FILE", ".expiry_alerts.lock")
+    # Workers are started fresh; drop anything the parent opened.
+    engine.dispose()
+
+    print(f"[startup] Production mode: {workers} worker(s) on http://{host}:{port} ({loop}, {http})")
+    uvicorn.run(
+        "app:app", host=host, port=port, workers=workers, reload=False, loop=loop, http=http
+    )
+
+
+if __name__ == "__main__" and os.getenv("SERVER_MODE", "development").lower() == "production":
+    serve_production()
+
+elif __name__ == "__main__":
+    # Only needed when run directly; uvicorn workers and reloads import `app`
+    # without paying for these.
+    from concurrent.futures import ThreadPoolExecutor
+
+    import uvicorn
+    from lan_ip import (
+        discover_addresses,
+        update_env_host,
+        update_env_var,
+        ensure_portproxy,
+        ensure_firewall_port,
+        is_wsl as _is_wsl,
+    )
+
     system = platform.system().lower()
     is_wsl = _is_wsl()
 
@@ -77,9 +177,18 @@ if __name__ == "__main__":
     reload = os.getenv("RELOAD", "True").lower() == "true"
     public_host = None
 
+    # Run every probe this platform needs at once (cached for LAN_IP_CACHE_TTL).
+    if system == "windows":
+        probes = ["windows_wifi_ip"]
+    elif is_wsl:
+        probes = ["windows_wifi_ip", "wsl_ip"]
+    else:
+        probes = ["lan_ip"]
+    addresses = discover_addresses(probes)
+
     host = None
     if system == "windows":
-        wifi_ip = get_windows_wifi_ip()
+        wifi_ip = addresses["windows_wifi_ip"]
         if wifi_ip:
             host = wifi_ip
             if update_env_host(host):
@@ -89,24 +198,27 @@ if __name__ == "__main__":
             print("[startup] Could not detect Windows Wi‑Fi IPv4; falling back to detection/env")
 
     if is_wsl:
-        public_host = get_windows_wifi_ip()
+        public_host = addresses["windows_wifi_ip"]
         if public_host:
             update_env_var("PUBLIC_HOST", public_host)
             os.environ["PUBLIC_HOST"] = public_host
             print(f"[startup] Detected Windows Wi‑Fi IP (PUBLIC_HOST): {public_host}")
         host = host or "0.0.0.0"
         # Try to auto-configure Windows portproxy + firewall so phones can reach the backend
-        wsl_ip = get_wsl_ip()
+        wsl_ip = addresses["wsl_ip"]
         if public_host and wsl_ip:
-            ok_fw, msg_fw = ensure_firewall_port(port)
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                firewall = pool.submit(ensure_firewall_port, port)
+                portproxy = pool.submit(ensure_portproxy, public_host, port, wsl_ip, port)
+                ok_fw, msg_fw = firewall.result()
+                ok_pp, msg_pp = portproxy.result()
             print(f"[startup] Firewall: {msg_fw}")
-            ok_pp, msg_pp = ensure_portproxy(public_host, port, wsl_ip, port)
             print(f"[startup] PortProxy: {msg_pp}")
             if not ok_pp:
                 print("[startup] If prompted with UAC, accept to complete the port forwarding.")
 
     if host is None:
-        detected_ip = get_lan_ip()
+        detected_ip = addresses.get("lan_ip") or addresses.get("windows_wifi_ip")
         host = detected_ip or os.getenv("HOST", "0.0.0.0")
         if detected_ip:
             if update_env_host(host):
@@ -0,0 +1,2 @@
+"""Benchmarks and load-testing tools. Run modules from the backend directory,
+e.g. `python -m benchmarks.serialization`."""
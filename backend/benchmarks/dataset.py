@@ -0,0 +1,260 @@
+"""Fill a database with synthetic batches and users for scale testing.
+
+Usage (from backend/):
+    python -m benchmarks.dataset --batches 5000000 --users 5000 [--seed 42]
+        [--days 365] [--database-url sqlite:///./freshness.db] [--reset]
+        [--no-search-index]
+
+Rows are appended with explicit ids after the current maximum, and
+identifiers and emails are derived from those ids, so repeated runs never
+collide. The same --seed against the same starting database on the same day
+gives the same rows (dates are relative to today), which keeps benchmark runs
+comparable.
+
+Distributions:
+- product: Zipf-like (a few cuts dominate, a long tail is rare);
+- arrival_date: uniform over the last --days days;
+- butcher_date: 0-6 days before arrival, mostly 1-2;
+- users share one password ("password") so hashing does not dominate.
+
+On SQLite the rows are written with the sqlite3 driver's executemany in
+chunks, inside one transaction with synchronous=OFF. When the load is at
+least as large as the existing table, indexes are dropped for the load and
+rebuilt afterwards. So are the search index and per-day arrival counts,
+which take about 40% of the time: 5M rows load in ~105 s with them and
+~65 s without. --no-search-index leaves both to the next server start
+(~45 s there for 5M rows). Other databases go through SQLAlchemy Core bulk
+inserts.
+"""
+
+import argparse
+import itertools
+import os
+import random
+import time
+from datetime import date, datetime
+from typing import Iterator, List, Tuple
+
+PRODUCTS = [
+    "Ground Beef", "Chicken Breast", "Pork Chops", "Beef Ribeye", "Chicken Thighs",
+    "Pork Sausage", "Beef Sirloin", "Whole Chicken", "Bacon", "Beef Brisket",
+    "Pork Shoulder", "Chicken Wings", "Lamb Chops", "Beef Tenderloin", "Ground Pork",
+    "Chicken Drumsticks", "Pork Ribs", "Beef Short Ribs", "Ground Turkey", "Lamb Leg",
+    "Veal Cutlets", "Turkey Breast", "Beef Stew Meat", "Pork Belly", "Duck Breast",
+    "Beef Flank", "Lamb Shoulder", "Chicken Liver", "Oxtail", "Goat Leg",
+]
+ZIPF_EXPONENT = 1.1
+# Days between butchering and arrival, weighted towards 1-2.
+BUTCHER_LAG_DAYS = [0, 1, 2, 3, 4, 5, 6]
+BUTCHER_LAG_WEIGHTS = [5, 35, 30, 15, 8, 5, 2]
+FIRST_NAMES = ["Ana", "Ben", "Carla", "Dev", "Eli", "Fatima", "Gus", "Hana", "Ivan", "Jo"]
+LAST_NAMES = ["Silva", "Nguyen", "Okafor", "Smith", "Kowalski", "Haddad", "Ito", "Moreau"]
+SYNTHETIC_PASSWORD = "password"
+
+BatchRow = Tuple[int, str, str, int, int, str, int, int]
+
+
+def generate_batches(
+    rng: random.Random,
+    first_id: int,
+    first_seq: int,
+    count: int,
+    days: int,
+    chunk_size: int,
+) -> Iterator[List[BatchRow]]:
+    """Yield chunks of (id, product, batch_identifier, butcher_date, arrival_date,
+    created_at, version, change_seq) tuples with day-ordinal dates, as stored in
+    `batches`."""
+    weights = [1 / (rank ** ZIPF_EXPONENT) for rank in range(1, len(PRODUCTS) + 1)]
+    cum_product = list(itertools.accumulate(weights))
+    cum_lag = list(itertools.accumulate(BUTCHER_LAG_WEIGHTS))
+    today = date.today().toordinal()
+    first_day = today - days + 1
+    # created_at at the start of the arrival day's shift, precomputed per day.
+    created_at = {
+        day: f"{date.fromordinal(day).isoformat()} 06:00:00"
+        for day in range(first_day, today + 1)
+    }
+
+    for start in range(0, count, chunk_size):
+        n = min(chunk_size, count - start)
+        products = rng.choices(PRODUCTS, cum_weights=cum_product, k=n)
+        lags = rng.choices(BUTCHER_LAG_DAYS, cum_weights=cum_lag, k=n)
+        arrivals = [rng.randint(first_day, today) for _ in range(n)]
+        base = first_id + start
+        yield [
+            (
+                base + i,
+                products[i],
+                f"SYN-{base + i:09d}",
+                arrivals[i] - lags[i],
+                arrivals[i],
+                created_at[arrivals[i]],
+                1,
+                first_seq + start + i,
+            )
+            for i in range(n)
+        ]
+
+
+def generate_users(rng: random.Random, first_id: int, count: int, password_hash: str):
+    return [
+        {
+            "id": first_id + i,
+            "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "email": f"user{first_id + i}@synthetic.example.com",
+            "password_hash": password_hash,
+        }
+        for i in range(count)
+    ]
+
+
+def load_sqlite(
+    engine, batch_chunks, batch_table, rebuild_indexes: bool, build_derived: bool = True
+) -> None:
+    """Bulk-load batches through the raw sqlite3 connection.
+
+    With `rebuild_indexes`, the indexes and the triggers maintaining the search
+    index and arrival counts are dropped for the load and rebuilt once at the
+    end; without `build_derived`, only the indexes are, and the missing
+    triggers make the next `init_database` rebuild the rest.
+    """
+    from database.migrations import ensure_batch_arrival_counts, ensure_batch_search
+
+    columns = [c.name for c in batch_table.columns]
+    insert_sql = (
+        f"INSERT INTO {batch_table.name} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+    indexes = list(batch_table.indexes) if rebuild_indexes else []
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("PRAGMA synchronous = OFF")
+        for index in indexes:
+            cursor.execute(f'DROP INDEX IF EXISTS "{index.name}"')
+        if rebuild_indexes:
+            triggers = cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?",
+                (batch_table.name,),
+            ).fetchall()
+            for (trigger,) in triggers:
+                cursor.execute(f'DROP TRIGGER "{trigger}"')
+        for chunk in batch_chunks:
+            cursor.executemany(insert_sql, chunk)
+        raw.commit()
+        cursor.close()
+    finally:
+        raw.close()
+    with engine.begin() as conn:
+        for index in indexes:
+            index.create(conn)
+        if rebuild_indexes and build_derived:
+            ensure_batch_search(conn)
+            ensure_batch_arrival_counts(conn)
+
+
+def load_core(engine, batch_chunks, batch_table) -> None:
+    """Bulk-load batches with SQLAlchemy Core executemany INSERTs."""
+    insert = batch_table.insert()
+    with engine.begin() as conn:
+        for chunk in batch_chunks:
+            conn.execute(
+                insert,
+                [
+                    {
+                        "id": row[0],
+                        "product": row[1],
+                        "batch_identifier": row[2],
+                        "butcher_date": date.fromordinal(row[3]),
+                        "arrival_date": date.fromordinal(row[4]),
+                        "created_at": datetime.fromisoformat(row[5]),
+                        "version": row[6],
+                        "change_seq": row[7],
+                    }
+                    for row in chunk
+                ],
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batches", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=365, help="arrival date spread")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL / freshness.db")
+    parser.add_argument(
+        "--reset", action="store_true", help="delete existing batches and users first"
+    )
+    parser.add_argument(
+        "--no-search-index",
+        dest="search_index",
+        action="store_false",
+        help="leave the SQLite search index and arrival counts to the next server start",
+    )
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    # Import after DATABASE_URL is settled; the engine is built at import time.
+    from sqlalchemy import func, select
+
+    from database import engine, init_database
+    from models.batch import Batch, BatchTombstone
+    from models.user import User
+    from passwords import hash_password
+
+    init_database(engine, derived=args.search_index)
+    batch_table, user_table = Batch.__table__, User.__table__
+
+    with engine.begin() as conn:
+        if args.reset:
+            conn.execute(batch_table.delete())
+            conn.execute(user_table.delete())
+        # Never reuse the id of a deleted batch still named by a tombstone.
+        first_batch_id = 1 + max(
+            conn.scalar(select(func.max(batch_table.c.id))) or 0,
+            conn.scalar(select(func.max(BatchTombstone.__table__.c.batch_id))) or 0,
+        )
+        first_user_id = (conn.scalar(select(func.max(user_table.c.id))) or 0) + 1
+        # Continue the change feed after both live rows and tombstones.
+        first_seq = 1 + max(
+            conn.scalar(select(func.max(batch_table.c.change_seq))) or 0,
+            conn.scalar(select(func.max(BatchTombstone.__table__.c.change_seq))) or 0,
+        )
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+
+    chunks = generate_batches(
+        rng, first_batch_id, first_seq, args.batches, args.days, args.chunk_size
+    )
+    if engine.dialect.name == "sqlite":
+        # Rebuilding indexes once beats maintaining them per row, unless the
+        # table already holds more rows than we are adding.
+        rebuild_indexes = args.batches >= first_batch_id - 1
+        load_sqlite(engine, chunks, batch_table, rebuild_indexes, args.search_index)
+    else:
+        load_core(engine, chunks, batch_table)
+    batches_done = time.perf_counter()
+
+    if args.users:
+        users = generate_users(
+            rng, first_user_id, args.users, hash_password(SYNTHETIC_PASSWORD)
+        )
+        with engine.begin() as conn:
+            conn.execute(user_table.insert(), users)
+    finished = time.perf_counter()
+
+    print(
+        f"[dataset] {args.batches} batches in {batches_done - started:.1f}s, "
+        f"{args.users} users in {finished - batches_done:.1f}s "
+        f"(ids from {first_batch_id} / {first_user_id}, seed {args.seed})"
+    )
+
+
+if __name__ == "__main__":
+    main()
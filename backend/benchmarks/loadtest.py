@@ -0,0 +1,266 @@
+"""HTTP load test for the API, in-process or against a live server.
+
+Usage (from backend/):
+    python -m benchmarks.loadtest [--url http://127.0.0.1:8000]
+        [--scenarios qr_scan,list_paging,batch_create,bulk_create,login_burst]
+        [--requests 2000] [--concurrency 50] [--seed-batches 5000]
+        [--output results.json]
+
+Without --url the app is driven in-process through httpx's ASGI transport
+against a throwaway SQLite file (set DATABASE_URL to use another database).
+With --url requests go over the network to a running uvicorn. Either way the
+harness seeds its own batches and user first, under a per-run identifier
+prefix.
+
+Scenarios:
+    qr_scan       GET /batches/{id} on random seeded ids
+    list_paging   GET /batches/ following X-Next-Cursor, 100 rows per page
+    batch_create  POST /batches/ with one new row per request
+    bulk_create   POST /batches/bulk with 100 new rows per request
+    login_burst   POST /auth/login for the seeded user
+
+Results are printed (and optionally written) as JSON: per scenario the request
+count, requests/sec, p50/p95/p99/max latency in ms and a count per status code,
+so runs can be diffed over time.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+SCENARIOS = ("qr_scan", "list_paging", "batch_create", "bulk_create", "login_burst")
+SEED_CHUNK = 1000
+BULK_ROWS = 100
+PAGE_SIZE = 100
+LOGIN_PASSWORD = "loadtest-password"
+
+RequestFn = Callable[[], Awaitable[httpx.Response]]
+
+
+def batch_rows(prefix: str, start: int, count: int) -> List[dict]:
+    today = date.today()
+    rows = []
+    for i in range(start, start + count):
+        arrival = today - timedelta(days=i % 10)
+        rows.append(
+            {
+                "product": f"Product {i % 25}",
+                "batch_identifier": f"{prefix}-{i:09d}",
+                "butcher_date": (arrival - timedelta(days=1 + i % 3)).isoformat(),
+                "arrival_date": arrival.isoformat(),
+            }
+        )
+    return rows
+
+
+async def seed(client: httpx.AsyncClient, prefix: str, batches: int) -> dict:
+    """Create the run's batches and login user; returns what scenarios need."""
+    ids: List[int] = []
+    for start in range(0, batches, SEED_CHUNK):
+        count = min(SEED_CHUNK, batches - start)
+        rows = batch_rows(prefix, start, count)
+        response = await client.post("/batches/bulk", json=rows)
+        response.raise_for_status()
+        ids.extend(r["id"] for r in response.json()["results"] if r.get("id"))
+
+    email = f"{prefix}@loadtest.example.com"
+    response = await client.post(
+        "/auth/register",
+        json={"email": email, "password": LOGIN_PASSWORD, "full_name": "Load Test"},
+    )
+    if response.status_code not in (200, 400):
+        response.raise_for_status()
+    return {"prefix": prefix, "ids": ids, "email": email, "next_bulk": batches}
+
+
+def scenario_worker(name: str, client: httpx.AsyncClient, state: dict) -> RequestFn:
+    """Build one worker's request function for a scenario."""
+    if name == "qr_scan":
+        ids = state["ids"]
+
+        async def qr_scan() -> httpx.Response:
+            return await client.get(f"/batches/{random.choice(ids)}")
+
+        return qr_scan
+
+    if name == "list_paging":
+        cursor = {"value": ""}
+
+        async def list_paging() -> httpx.Response:
+            params = {"cursor": cursor["value"], "limit": PAGE_SIZE}
+            response = await client.get("/batches/", params=params)
+            cursor["value"] = response.headers.get("x-next-cursor", "")
+            return response
+
+        return list_paging
+
+    if name == "batch_create":
+
+        async def batch_create() -> httpx.Response:
+            start = state["next_bulk"]
+            state["next_bulk"] += 1
+            row = batch_rows(state["prefix"], start, 1)[0]
+            return await client.post("/batches/", json=row)
+
+        return batch_create
+
+    if name == "bulk_create":
+
+        async def bulk_create() -> httpx.Response:
+            start = state["next_bulk"]
+            state["next_bulk"] += BULK_ROWS
+            rows = batch_rows(state["prefix"], start, BULK_ROWS)
+            return await client.post("/batches/bulk", json=rows)
+
+        return bulk_create
+
+    if name == "login_burst":
+        body = {"email": state["email"], "password": LOGIN_PASSWORD}
+
+        async def login_burst() -> httpx.Response:
+            return await client.post("/auth/login", json=body)
+
+        return login_burst
+
+    raise ValueError(f"Unknown scenario {name!r}")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(pct / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+async def run_scenario(
+    name: str, client: httpx.AsyncClient, state: dict, requests: int, concurrency: int
+) -> dict:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = {"count": requests}
+
+    async def worker() -> None:
+        send = scenario_worker(name, client, state)
+        while remaining["count"] > 0:
+            remaining["count"] -= 1
+            start = time.perf_counter()
+            try:
+                response = await send()
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                # Count it like a status code; one failing request must not
+                # abort the run and lose the report.
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "duration_s": round(duration, 3),
+        "rps": round(len(latencies) / duration, 1) if duration else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ms, 50), 2),
+            "p95": round(percentile(ms, 95), 2),
+            "p99": round(percentile(ms, 99), 2),
+            "max": round(ms[-1], 2) if ms else 0.0,
+        },
+        "status": dict(statuses),
+    }
+
+
+def make_client(url: str, concurrency: int) -> httpx.AsyncClient:
+    timeout = httpx.Timeout(30.0)
+    if url:
+        limits = httpx.Limits(max_connections=concurrency)
+        return httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits)
+
+    # In-process: import the app only now, after DATABASE_URL is settled.
+    from app import app
+
+    # Unhandled app exceptions come back as 500s, as from a real server.
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(
+        transport=transport, base_url="http://loadtest", timeout=timeout
+    )
+
+
+async def run(args: argparse.Namespace) -> dict:
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    prefix = f"LT-{uuid.uuid4().hex[:8]}"
+    client = make_client(args.url, args.concurrency)
+    if not args.url:
+        # httpx's ASGI transport sends no lifespan events; run startup here.
+        from app import app
+
+        await app.router.startup()
+    async with client:
+        state = await seed(client, prefix, args.seed_batches)
+        results: Dict[str, dict] = {}
+        for name in scenarios:
+            results[name] = await run_scenario(
+                name, client, state, args.requests, args.concurrency
+            )
+            print(f"[loadtest] {name}: {results[name]['rps']} req/s", file=sys.stderr)
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "target": args.url or "asgi",
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed_batches": args.seed_batches,
+        },
+        "scenarios": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--url", default="", help="live server base URL (default: in-process)"
+    )
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument(
+        "--requests", type=int, default=2000, help="requests per scenario"
+    )
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seed-batches", type=int, default=5000)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    tmpdir = None
+    if not args.url and "DATABASE_URL" not in os.environ:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir.name}/loadtest.db"
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Microbenchmark of the QR-scan hot path behind GET /batches/{id}.
+
+Usage (from backend/):
+    python -m benchmarks.qr_scan [--rows 1000] [--requests 2000]
+
+Compares, per request, the time and peak traced memory of:
+
+- "orm":        load the ORM instance, spread its __dict__ into a dict and
+                let FastAPI validate and encode it through
+                response_model=BatchWithFreshness into a JSONResponse (what
+                the endpoint used to do), and
+- "projection": select the freshness columns as a Core row and serialize it
+                as BatchWithFreshness (what it does now).
+
+Both run with a fresh AsyncSession per request like the real dependency,
+always against a throwaway SQLite file that the benchmark seeds itself
+(DATABASE_URL is ignored, so no real database is ever cleared). Time is
+dominated by session setup and the round trip to aiosqlite's worker thread,
+which both paths share, so expect the memory column to move more than the
+time column.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+_tmpdir = tempfile.TemporaryDirectory()
+# seed() clears the batches table, so never point at a configured database.
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir.name}/qr_scan.db"
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from api.routers.batches import freshness_json  # noqa: E402
+from controllers import batches as batches_controller  # noqa: E402
+from database import AsyncSessionLocal, Base, engine  # noqa: E402
+from models import Batch  # noqa: E402
+from schemas import BatchWithFreshness  # noqa: E402
+
+# The field FastAPI builds for response_model=BatchWithFreshness.
+RESPONSE_FIELD = create_response_field(name="response", type_=BatchWithFreshness)
+
+
+def seed(rows: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    start = date(2026, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(Batch.__table__.delete())
+        conn.execute(
+            Batch.__table__.insert(),
+            [
+                {
+                    "product": f"Product {i % 50}",
+                    "batch_identifier": f"BATCH-{i:08d}",
+                    "butcher_date": start + timedelta(days=i % 30),
+                    "arrival_date": start + timedelta(days=i % 30 + 1),
+                }
+                for i in range(1, rows + 1)
+            ],
+        )
+
+
+async def orm_path(batch_id: int) -> bytes:
+    async with AsyncSessionLocal() as db:
+        db_batch = await batches_controller.get_batch(db, batch_id)
+        days_on_shelf = (date.today() - db_batch.arrival_date).days
+        content = {**db_batch.__dict__, "days_on_shelf": days_on_shelf}
+        encoded = await serialize_response(
+            field=RESPONSE_FIELD, response_content=content
+        )
+        return JSONResponse(encoded).body
+
+
+async def projection_path(batch_id: int) -> bytes:
+    async with AsyncSessionLocal() as db:
+        row = await batches_controller.get_batch_freshness(db, batch_id, date.today())
+        return freshness_json.dump_json(row)
+
+
+async def measure(name: str, path, rows: int, requests: int) -> None:
+    ids = [(i * 7919) % rows + 1 for i in range(requests)]
+    for batch_id in ids[:100]:  # warm up connections and statement caches
+        await path(batch_id)
+
+    start = time.perf_counter()
+    for batch_id in ids:
+        await path(batch_id)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    peaks = []
+    for batch_id in ids[: min(requests, 500)]:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        await path(batch_id)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    per_request_us = elapsed / requests * 1e6
+    peak_kib = sum(peaks) / len(peaks) / 1024
+    print(f"{name:<11} {per_request_us:8.1f} us/request {peak_kib:6.1f} KiB peak/request")
+
+
+async def run(rows: int, requests: int) -> None:
+    assert json.loads(await orm_path(1)) == json.loads(await projection_path(1))
+    print(f"{rows} rows, {requests} requests")
+    await measure("orm", orm_path, rows, requests)
+    await measure("projection", projection_path, rows, requests)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    asyncio.run(run(args.rows, args.requests))
+
+
+if __name__ == "__main__":
+    main()
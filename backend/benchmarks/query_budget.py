@@ -0,0 +1,76 @@
+"""SQL statement budgets per endpoint, to catch N+1 regressions.
+
+Usage (from backend/):
+    python -m benchmarks.query_budget
+
+Seeds a throwaway SQLite file (DATABASE_URL is ignored), calls each endpoint
+in BUDGETS once and checks the statements its request ran, as reported in the
+Server-Timing header, with `database.profiling.assert_max_queries`. Exits
+non-zero if any endpoint goes over budget. Creates through group commit run
+in the shared flush and are not charged to the request, so POST /batches/ is
+not listed.
+"""
+
+import os
+import sys
+import tempfile
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir.name}/query_budget.db"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from database.profiling import assert_max_queries, query_count  # noqa: E402
+
+SEED_BATCHES = 20
+USER = {"email": "budget@example.com", "password": "budget-pass", "full_name": "Budget"}
+
+# (method, path, JSON body, max statements)
+BUDGETS = [
+    # SELECT the email, INSERT the user, refresh it.
+    ("POST", "/auth/register", USER, 3),
+    ("POST", "/auth/login", {"email": USER["email"], "password": USER["password"]}, 1),
+    ("GET", "/batches/", None, 1),
+    ("GET", "/batches/?cursor=&limit=5", None, 1),
+    ("GET", "/batches/freshness", None, 1),
+    ("GET", "/batches/1", None, 1),
+    ("GET", "/batches/stats", None, 2),
+    ("GET", "/batches/changes", None, 2),
+    ("GET", "/batches/search?q=BUDGET", None, 2),
+]
+
+
+def seed(client: TestClient) -> None:
+    batches = [
+        {
+            "product": f"Product {i % 4}",
+            "batch_identifier": f"BUDGET-{i:04d}",
+            "butcher_date": "2026-01-01",
+            "arrival_date": "2026-01-02",
+        }
+        for i in range(SEED_BATCHES)
+    ]
+    client.post("/batches/bulk", json=batches).raise_for_status()
+
+
+def main() -> int:
+    from app import app
+
+    failures = 0
+    with TestClient(app) as client:
+        seed(client)
+        for method, path, body, limit in BUDGETS:
+            response = client.request(method, path, json=body)
+            response.raise_for_status()
+            try:
+                assert_max_queries(response, limit)
+            except AssertionError as e:
+                failures += 1
+                print(f"FAIL {e}")
+            else:
+                print(f"ok   {method} {path}: {query_count(response)}/{limit} queries")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Per-row cost of serializing a batch list: FastAPI's default path vs the fast path.
+
+Usage (from backend/):
+    python -m benchmarks.serialization [--rows 10000] [--repeat 5]
+
+"default" is what FastAPI does for `response_model=List[Batch]`: validate the
+return value, convert it with jsonable_encoder and json.dumps it. "fast" is
+`api.serialization.TrustedSerializer`, optionally wrapped in ORJSONResponse.
+Rows are transient ORM objects, so no database is involved.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api.serialization import TrustedSerializer
+from models import Batch as BatchModel
+from schemas import Batch
+
+
+def make_rows(count: int) -> List[BatchModel]:
+    start = date(2026, 1, 1)
+    created = datetime(2026, 1, 1, 12, 0, 0)
+    return [
+        BatchModel(
+            id=i,
+            product=f"Product {i % 50}",
+            batch_identifier=f"BATCH-{i:08d}",
+            butcher_date=start + timedelta(days=i % 30),
+            arrival_date=start + timedelta(days=i % 30 + 1),
+            created_at=created,
+            version=1,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def default_path(field, rows) -> bytes:
+    content = asyncio.run(
+        serialize_response(field=field, response_content=rows, is_coroutine=True)
+    )
+    return JSONResponse(content).body
+
+
+def bench(name: str, func: Callable[[], bytes], rows: int, repeat: int) -> float:
+    func()  # warm up
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    per_row_us = best / rows * 1e6
+    print(f"{name:<10} {best * 1000:9.1f} ms total {per_row_us:8.2f} us/row")
+    return per_row_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    field = create_response_field(name="Response", type_=List[Batch])
+    fast = TrustedSerializer(List[Batch])
+
+    # Both paths must produce the same document.
+    assert json.loads(fast.dump_json(rows)) == json.loads(default_path(field, rows))
+
+    print(f"{args.rows} rows, best of {args.repeat}")
+    before = bench(
+        "default", lambda: default_path(field, rows), args.rows, args.repeat
+    )
+    after = bench("fast", lambda: fast.dump_json(rows), args.rows, args.repeat)
+    print(f"speedup    {before / after:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Startup benchmark: time from process start to the first served request.
+
+Usage (from backend/):
+    python -m benchmarks.startup [--runs 5] [--entrypoint uvicorn|main]
+        [--port 8765] [--output startup.json]
+
+Each run starts a fresh server process and polls GET /config/public until it
+answers 200. The reported time covers the interpreter start, imports, the
+startup phase (schema creation and migrations) and binding the socket:
+
+    uvicorn   python -m uvicorn app:app on 127.0.0.1 (what workers and
+              reloads pay)
+    main      python app.py with RELOAD=False, including LAN/WSL network
+              discovery; the polled address is read from its
+              "[startup] Binding backend to ..." line. Note that app.py
+              updates HOST in backend/.env as usual.
+
+`import_ms` separately times `import app` in a fresh interpreter. Without
+DATABASE_URL set, all runs share one throwaway SQLite file, so the first run
+creates the schema and later runs find it in place.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BIND_LINE = re.compile(r"\[startup\] Binding backend to (http://\S+)")
+POLL_INTERVAL = 0.01
+
+
+def time_import(env: dict) -> float:
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1]) * 1000
+
+
+def _watch_bind_line(process: subprocess.Popen, found: dict) -> None:
+    for line in process.stdout:
+        match = BIND_LINE.search(line)
+        if match and "url" not in found:
+            found["url"] = match.group(1)
+
+
+def time_first_request(entrypoint: str, port: int, env: dict, timeout: float) -> float:
+    """Seconds from spawning the server until GET /config/public returns 200."""
+    if entrypoint == "uvicorn":
+        cmd = [
+            sys.executable, "-m", "uvicorn", "app:app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        ]
+    else:
+        cmd = [sys.executable, "app.py"]
+        env = {**env, "PORT": str(port), "RELOAD": "False", "PYTHONUNBUFFERED": "1"}
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        cmd,
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    found = {"url": f"http://127.0.0.1:{port}"} if entrypoint == "uvicorn" else {}
+    threading.Thread(target=_watch_bind_line, args=(process, found), daemon=True).start()
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                if process.poll() is not None:
+                    raise RuntimeError(f"server exited with code {process.returncode}")
+                url: Optional[str] = found.get("url")
+                if url:
+                    # A 0.0.0.0 bind is reachable on loopback.
+                    url = url.replace("0.0.0.0", "127.0.0.1")
+                    try:
+                        if client.get(f"{url}/config/public").status_code == 200:
+                            return time.perf_counter() - started
+                    except httpx.HTTPError:
+                        pass
+                time.sleep(POLL_INTERVAL)
+        raise RuntimeError(f"no response within {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def summarize(values_ms: List[float]) -> dict:
+    return {
+        "min": round(min(values_ms), 1),
+        "median": round(statistics.median(values_ms), 1),
+        "max": round(max(values_ms), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--entrypoint", choices=("uvicorn", "main"), default="uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    tmpdir = None
+    if "DATABASE_URL" not in env:
+        tmpdir = tempfile.TemporaryDirectory()
+        env["DATABASE_URL"] = f"sqlite:///{tmpdir.name}/startup.db"
+
+    imports = [time_import(env) for _ in range(args.runs)]
+    first_request = []
+    for run in range(args.runs):
+        seconds = time_first_request(args.entrypoint, args.port, env, args.timeout)
+        first_request.append(seconds * 1000)
+        print(f"[startup-bench] run {run + 1}: {seconds * 1000:.0f} ms", file=sys.stderr)
+
+    report = {
+        "entrypoint": args.entrypoint,
+        "runs": args.runs,
+        "import_ms": summarize(imports),
+        "time_to_first_request_ms": summarize(first_request),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
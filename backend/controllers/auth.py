@@ -2,15 +2,29 @@ import os
 import jwt
 from datetime import datetime, timedelta
 from typing import Optional
-from sqlalchemy.orm import Session
+from cache import TTLCache
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.user import User
+from passwords import password_hasher
 from schemas.user import UserCreate, UserResponse
 
+# Authenticated users by id, so most requests skip the users table.
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "60")),
+)
+
 
 class AuthController:
     SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+    # Carry the profile in the token so authenticated requests need no lookup at
+    # all; profile changes then show up only in tokens issued afterwards.
+    USER_CLAIMS_IN_TOKEN = (
+        os.getenv("AUTH_USER_CLAIMS_IN_TOKEN", "False").lower() == "true"
+    )
 
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -28,6 +42,28 @@ class AuthController:
         )
         return encoded_jwt
 
+    @staticmethod
+    def token_claims(user: User) -> dict:
+        """Build the claims for a user's access token."""
+        claims = {"sub": user.id, "email": user.email}
+        if AuthController.USER_CLAIMS_IN_TOKEN:
+            claims["name"] = user.full_name
+            created_at = user.created_at
+            claims["created_at"] = created_at.isoformat() if created_at else None
+        return claims
+
+    @staticmethod
+    def user_from_claims(payload: dict) -> Optional[UserResponse]:
+        """Rebuild the user from token claims, or None if the token lacks them."""
+        if "name" not in payload:
+            return None
+        return UserResponse(
+            id=payload["sub"],
+            email=payload["email"],
+            full_name=payload["name"],
+            created_at=payload.get("created_at"),
+        )
+
     @staticmethod
     def verify_token(token: str) -> Optional[dict]:
         """Verify a JWT token and return the payload."""
@@ -42,40 +78,63 @@ class AuthController:
             return None
 
     @staticmethod
-    def register_user(db: Session, user_data: UserCreate) -> tuple[str, UserResponse]:
+    async def register_user(
+        db: AsyncSession, user_data: UserCreate
+    ) -> tuple[str, UserResponse]:
         """Register a new user."""
         # Check if user already exists
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
+        existing_user = await AuthController.get_user_by_email(db, user_data.email)
         if existing_user:
             raise ValueError("Email already registered")
 
-        # Create new user
+        # Create new user; PBKDF2 runs in the bounded hashing pool
         user = User(full_name=user_data.full_name, email=user_data.email)
-        user.set_password(user_data.password)
+        user.password_hash = await password_hasher.hash(user_data.password)
 
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
 
         # Create token
-        token = AuthController.create_access_token({"sub": user.id, "email": user.email})
+        token = AuthController.create_access_token(AuthController.token_claims(user))
 
         return token, UserResponse.from_orm(user)
 
     @staticmethod
-    def login_user(db: Session, email: str, password: str) -> tuple[str, UserResponse]:
+    async def login_user(
+        db: AsyncSession, email: str, password: str
+    ) -> tuple[str, UserResponse]:
         """Authenticate a user and return token."""
-        user = db.query(User).filter(User.email == email).first()
+        user = await AuthController.get_user_by_email(db, email)
 
-        if not user or not user.verify_password(password):
+        if not user or not await password_hasher.verify(password, user.password_hash):
             raise ValueError("Invalid email or password")
 
         # Create token
-        token = AuthController.create_access_token({"sub": user.id, "email": user.email})
+        token = AuthController.create_access_token(AuthController.token_claims(user))
 
         return token, UserResponse.from_orm(user)
 
     @staticmethod
-    def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
+    async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
         """Get a user by ID."""
-        return db.query(User).filter(User.id == user_id).first()
+        return await db.get(User, user_id)
+
+    @staticmethod
+    async def get_cached_user(db: AsyncSession, user_id: int) -> Optional[UserResponse]:
+        """Get a user's profile by ID, served from the in-process cache when fresh."""
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            return cached
+        user = await AuthController.get_user_by_id(db, user_id)
+        if user is None:
+            return None
+        profile = UserResponse.from_orm(user)
+        user_cache.set(user_id, profile)
+        return profile
+
+    @staticmethod
+    async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+        """Get a user by email."""
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
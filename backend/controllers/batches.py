@@ -1,31 +1,966 @@
 """Controllers for business logic."""
 
-from sqlalchemy.orm import Session
-from typing import List, Optional
+import asyncio
+import base64
+import csv
+import io
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
 
-from models import Batch
+from sqlalchemy import (
+    Integer,
+    and_,
+    bindparam,
+    case,
+    column,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    table,
+    text,
+    type_coerce,
+)
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from database import AsyncSessionLocal, async_engine
+from events import EventBroker
+from expiry import EventSink, ExpiryScheduler, LogSink, WebhookSink
+from group_commit import GroupCommitQueue
+from models import Batch, BatchTombstone
 from schemas import BatchCreate
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
-def create_batch(db: Session, batch: BatchCreate) -> Batch:
-    """Create a new batch of products."""
-    db_batch = Batch(
-        product=batch.product,
-        batch_identifier=batch.batch_identifier,
-        butcher_date=batch.butcher_date,
-        arrival_date=batch.arrival_date,
-    )
+logger = logging.getLogger(__name__)
+
+
+# Keep IN (...) lists well under SQLite's bound-parameter limit.
+IN_CLAUSE_CHUNK = 500
+
+
+def _chunks(items: List, size: int = IN_CLAUSE_CHUNK) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def _existing_identifiers(db: AsyncSession, identifiers: List[str]) -> Set[str]:
+    """Return which of the given batch identifiers are already stored."""
+    found: Set[str] = set()
+    for chunk in _chunks(identifiers):
+        rows = await db.execute(
+            select(Batch.batch_identifier).where(Batch.batch_identifier.in_(chunk))
+        )
+        found.update(rows.scalars())
+    return found
+
+
+async def _stored_batches(
+    db: AsyncSession, identifiers: List[str]
+) -> Dict[str, Batch]:
+    """Load the stored batches for the given identifiers, keyed by identifier."""
+    stored: Dict[str, Batch] = {}
+    for chunk in _chunks(identifiers):
+        rows = await db.execute(select(Batch).where(Batch.batch_identifier.in_(chunk)))
+        stored.update((batch.batch_identifier, batch) for batch in rows.scalars())
+    return stored
+
+
+class DatabaseBusyError(RuntimeError):
+    """Raised when a batch write gave up waiting for the database write lock."""
+
+
+# Batch writes from this process take turns. A bulk insert or delete reads
+# before it writes, and under WAL a transaction that upgrades from reading to
+# writing fails straight away with "database is locked" (busy_timeout does
+# not apply) if another connection committed in between. So on SQLite the
+# transaction takes the write lock up front with BEGIN IMMEDIATE, which does
+# wait through busy_timeout, queueing writers from other worker processes too;
+# the asyncio lock keeps this process's writers from holding pool connections
+# while they wait on each other.
+_batch_write_lock = asyncio.Lock()
+
+
+@asynccontextmanager
+async def _batch_write(db: AsyncSession):
+    """Run a write transaction holding the batch write lock(s).
+
+    Must be entered before the session has run anything. A lock timeout
+    becomes DatabaseBusyError.
+    """
+    async with _batch_write_lock:
+        try:
+            if db.bind.dialect.name == "sqlite":
+                await db.execute(text("BEGIN IMMEDIATE"))
+            yield
+        except OperationalError as e:
+            if "locked" not in str(e.orig):
+                raise
+            await db.rollback()
+            raise DatabaseBusyError("The database is busy, try again shortly") from e
+
+
+def _batch_row(batch: BatchCreate) -> dict:
+    return {
+        "product": batch.product,
+        "batch_identifier": batch.batch_identifier,
+        "butcher_date": batch.butcher_date,
+        "arrival_date": batch.arrival_date,
+    }
+
+
+def batch_event(batch: Batch) -> dict:
+    """A batch as it appears in change events (same fields as the Batch schema)."""
+    return {
+        "id": batch.id,
+        "product": batch.product,
+        "batch_identifier": batch.batch_identifier,
+        "butcher_date": batch.butcher_date.isoformat(),
+        "arrival_date": batch.arrival_date.isoformat(),
+        "created_at": batch.created_at.isoformat() if batch.created_at else None,
+    }
+
+
+def _publish_created(batches: Iterable[Batch]) -> None:
+    batches = list(batches)
+    rows = [batch_event(batch) for batch in batches]
+    if not rows:
+        return
+    if BATCH_EVENTS_POLL_SECONDS > 0:
+        _published_ids.update(row["id"] for row in rows)
+    batch_events.publish("created", rows)
+    _schedule_expiry(batches)
+
+
+async def _create_one(db: AsyncSession, batch: BatchCreate):
+    """Insert one batch in its own transaction; a ValueError on a taken identifier."""
+    db_batch = Batch(**_batch_row(batch))
     db.add(db_batch)
-    db.commit()
-    db.refresh(db_batch)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return ValueError("Batch identifier already exists")
+    await db.refresh(db_batch)
+    # Detach it loaded, so a later rollback on this session cannot expire it.
+    db.expunge(db_batch)
     return db_batch
 
 
-def get_batches(db: Session, skip: int = 0, limit: int = 100) -> List[Batch]:
+async def _commit_batch_group(batches: List[BatchCreate]) -> List[object]:
+    """Insert a group of single-batch creations with one INSERT and one commit.
+
+    Returns the stored Batch for each input, in order. If any identifier is
+    taken (already stored, or repeated within the group), the group is retried
+    one transaction per row so only the callers that conflict get a ValueError.
+    """
+    async with AsyncSessionLocal() as db, _batch_write(db):
+        try:
+            await db.execute(Batch.__table__.insert(), [_batch_row(b) for b in batches])
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            outcomes = [await _create_one(db, batch) for batch in batches]
+            _publish_created(o for o in outcomes if not isinstance(o, Exception))
+            return outcomes
+
+        stored = await _stored_batches(db, [b.batch_identifier for b in batches])
+        outcomes = [stored[b.batch_identifier] for b in batches]
+        _publish_created(outcomes)
+        return outcomes
+
+
+# Change events for GET /batches/stream (see events.py). The broker is per
+# process; with several workers, each one also polls for batches the others
+# created every BATCH_EVENTS_POLL_SECONDS (0 = off, the single-process default).
+batch_events = EventBroker(
+    queue_size=int(os.getenv("BATCH_EVENTS_QUEUE_SIZE", "256")),
+    history=int(os.getenv("BATCH_EVENTS_HISTORY", "1024")),
+    max_subscribers=int(os.getenv("BATCH_EVENTS_MAX_CLIENTS", "1000")),
+)
+BATCH_EVENTS_POLL_SECONDS = float(os.getenv("BATCH_EVENTS_POLL_SECONDS", "0"))
+TAIL_BATCH_LIMIT = 1000
+# Ids this process already published, so the tailer does not repeat them.
+_published_ids: Set[int] = set()
+_tailer: Optional[asyncio.Task] = None
+
+
+async def _tail_batch_events(interval: float) -> None:
+    """Publish batches inserted by other processes, polling `id > last seen`."""
+    global _published_ids
+    async with AsyncSessionLocal() as db:
+        last_id = (await db.execute(select(func.max(Batch.id)))).scalar() or 0
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = (
+                    await db.execute(
+                        select(Batch)
+                        .where(Batch.id > last_id)
+                        .order_by(Batch.id)
+                        .limit(TAIL_BATCH_LIMIT)
+                    )
+                ).scalars().all()
+        except Exception:
+            logger.exception("Polling for new batches failed")
+            continue
+        if not rows:
+            continue
+        last_id = rows[-1].id
+        fresh = [batch for batch in rows if batch.id not in _published_ids]
+        _published_ids = {i for i in _published_ids if i > last_id}
+        if fresh:
+            batch_events.publish("created", [batch_event(batch) for batch in fresh])
+            _schedule_expiry(fresh)
+
+
+async def start_event_tailer() -> None:
+    """Startup hook: begin polling for other workers' batches, if enabled."""
+    global _tailer
+    if BATCH_EVENTS_POLL_SECONDS > 0 and _tailer is None:
+        _tailer = asyncio.ensure_future(_tail_batch_events(BATCH_EVENTS_POLL_SECONDS))
+
+
+async def stop_event_tailer() -> None:
+    """Shutdown hook: stop the poller started by `start_event_tailer`."""
+    global _tailer
+    if _tailer is not None:
+        _tailer.cancel()
+        _tailer = None
+
+
+# Single-batch creates from concurrent requests are committed together (see
+# group_commit.py). On by default for SQLite, where every commit is an fsync
+# under the database-wide write lock.
+BATCH_GROUP_COMMIT = os.getenv(
+    "BATCH_GROUP_COMMIT", str(async_engine.dialect.name == "sqlite")
+).lower() == "true"
+batch_write_queue: Optional[GroupCommitQueue[BatchCreate, Batch]] = None
+if BATCH_GROUP_COMMIT:
+    batch_write_queue = GroupCommitQueue(
+        _commit_batch_group,
+        window=float(os.getenv("BATCH_GROUP_COMMIT_WINDOW_MS", "2")) / 1000,
+        max_size=int(os.getenv("BATCH_GROUP_COMMIT_MAX_SIZE", "100")),
+    )
+
+
+async def create_batch(db: AsyncSession, batch: BatchCreate) -> Batch:
+    """Create a new batch of products.
+
+    Goes through `batch_write_queue` when group commit is on. Raises
+    ValueError if the batch identifier already exists, DatabaseBusyError if
+    the database stayed locked.
+    """
+    if batch_write_queue is not None:
+        return await batch_write_queue.submit(batch)
+    async with _batch_write(db):
+        result = await _create_one(db, batch)
+    if isinstance(result, ValueError):
+        raise result
+    _publish_created([result])
+    return result
+
+
+async def bulk_create_batches(
+    db: AsyncSession, batches: List[BatchCreate]
+) -> List[dict]:
+    """Create many batches in a single transaction.
+
+    Rows whose `batch_identifier` already exists (or repeats earlier in the
+    same request) are reported as conflicts and skipped; the rest are written
+    with one executemany INSERT and one commit. Returns one result dict per
+    input row, in input order. Raises ValueError if a concurrent writer
+    inserted a conflicting identifier between the check and the insert, and
+    DatabaseBusyError if the write lock could not be had in time.
+    """
+    async with _batch_write(db):
+        return await _bulk_create(db, batches)
+
+
+async def _bulk_create(db: AsyncSession, batches: List[BatchCreate]) -> List[dict]:
+    identifiers = [b.batch_identifier for b in batches]
+    existing = await _existing_identifiers(db, list(set(identifiers)))
+
+    results: List[dict] = []
+    rows: List[dict] = []
+    seen: Set[str] = set()
+    for index, batch in enumerate(batches):
+        ident = batch.batch_identifier
+        result = {"index": index, "batch_identifier": ident}
+        if ident in existing:
+            result.update(status="conflict", detail="Batch identifier already exists")
+        elif ident in seen:
+            result.update(status="conflict", detail="Duplicate batch identifier in request")
+        else:
+            seen.add(ident)
+            result["status"] = "created"
+            rows.append(_batch_row(batch))
+        results.append(result)
+
+    if rows:
+        try:
+            await db.execute(Batch.__table__.insert(), rows)
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise ValueError(
+                "A batch identifier was registered concurrently; retry the request"
+            )
+        stored = await _stored_batches(db, [row["batch_identifier"] for row in rows])
+        for result in results:
+            if result["status"] == "created":
+                result["id"] = stored[result["batch_identifier"]].id
+        _publish_created(stored.values())
+
+    return results
+
+
+async def delete_batch(db: AsyncSession, batch_id: int) -> bool:
+    """Delete a batch, leaving a tombstone for the change feed.
+
+    Returns False if there is no such batch.
+    """
+    async with _batch_write(db):
+        batch = await db.get(Batch, batch_id)
+        if batch is None:
+            return False
+        event = {"id": batch.id, "batch_identifier": batch.batch_identifier}
+        await db.execute(
+            BatchTombstone.__table__.insert().values(
+                batch_id=batch.id, batch_identifier=batch.batch_identifier
+            )
+        )
+        await db.delete(batch)
+        await db.commit()
+    batch_events.publish("deleted", [event])
+    return True
+
+
+def _filter_arrived_since(query, arrived_since: Optional[date]):
+    """Restrict a batch query to arrivals on or after the given date (indexed)."""
+    if arrived_since is None:
+        return query
+    return query.where(Batch.arrival_date >= arrived_since)
+
+
+async def get_batches(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    arrived_since: Optional[date] = None,
+) -> List[Batch]:
     """Get all batches with pagination."""
-    return db.query(Batch).offset(skip).limit(limit).all()
+    query = _filter_arrived_since(select(Batch), arrived_since)
+    result = await db.execute(query.offset(skip).limit(limit))
+    return result.scalars().all()
+
+
+def _encode_token(key: str, value: int) -> str:
+    raw = json.dumps({key: value}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_token(token: str, key: str, error: str) -> int:
+    if not token:
+        return 0
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value = int(payload[key])
+    except (ValueError, TypeError, KeyError, UnicodeEncodeError):
+        raise ValueError(error)
+    if value < 0:
+        raise ValueError(error)
+    return value
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the last seen batch id as an opaque pagination cursor."""
+    return _encode_token("id", last_id)
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor produced by `encode_cursor`. Raises ValueError if invalid."""
+    return _decode_token(cursor, "id", "Invalid cursor")
+
+
+async def get_batches_after(
+    db: AsyncSession,
+    cursor: str,
+    limit: int = 100,
+    arrived_since: Optional[date] = None,
+) -> Tuple[List[Batch], Optional[str]]:
+    """Get a page of batches ordered by id, starting after the given cursor.
+
+    Uses keyset pagination (`WHERE id > :last_id ORDER BY id`) so every page
+    is an index range scan regardless of depth. Returns the page and the
+    cursor for the next page, or None when this is the last page. Raises
+    ValueError for an invalid cursor or a `limit` below 1.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    last_id = decode_cursor(cursor)
+    query = (
+        _filter_arrived_since(select(Batch), arrived_since)
+        .where(Batch.id > last_id)
+        .order_by(Batch.id)
+        .limit(limit + 1)
+    )
+    rows = (await db.execute(query)).scalars().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].id)
+    return rows, None
+
+
+class DeltaSyncUnsupportedError(RuntimeError):
+    """Raised by get_changes on databases whose writers may commit out of order."""
+
+
+def encode_change_token(seq: int) -> str:
+    """Encode a change sequence number as an opaque delta-sync resume token."""
+    return _encode_token("seq", seq)
+
+
+def decode_change_token(token: str) -> int:
+    """Decode a token from `encode_change_token`. Raises ValueError if invalid."""
+    return _decode_token(token, "seq", "Invalid change token")
+
+
+async def get_changes(
+    db: AsyncSession, since: str, limit: int = 500
+) -> Tuple[List[dict], str, bool]:
+    """Get batch changes after the `since` token, in change order.
+
+    Inserts and updates come from `batches` and deletions from
+    `batch_tombstones`, each an index range scan on `change_seq`, so the cost
+    follows the number of changes rather than the table size. A batch edited
+    several times appears once, at its latest sequence. Returns the changes,
+    the token to resume from and whether more changes are waiting.
+
+    SQLite only: sequence numbers follow commit order there because it has a
+    single writer. Elsewhere concurrent transactions could commit a lower
+    number after a client resumed past it, silently skipping that change, so
+    DeltaSyncUnsupportedError is raised instead.
+    """
+    if db.bind.dialect.name != "sqlite":
+        raise DeltaSyncUnsupportedError(
+            "Delta sync is only available on SQLite; use GET /batches/ for a full sync"
+        )
+    after = decode_change_token(since)
+    upserts = (
+        await db.execute(
+            select(Batch)
+            .where(Batch.change_seq > after)
+            .order_by(Batch.change_seq)
+            .limit(limit + 1)
+        )
+    ).scalars().all()
+    deletes = (
+        await db.execute(
+            select(BatchTombstone)
+            .where(BatchTombstone.change_seq > after)
+            .order_by(BatchTombstone.change_seq)
+            .limit(limit + 1)
+        )
+    ).scalars().all()
+
+    changes = [
+        {
+            "seq": b.change_seq,
+            "op": "upsert",
+            "id": b.id,
+            "batch_identifier": b.batch_identifier,
+            "batch": b,
+        }
+        for b in upserts
+    ] + [
+        {
+            "seq": t.change_seq,
+            "op": "delete",
+            "id": t.batch_id,
+            "batch_identifier": t.batch_identifier,
+            "batch": None,
+        }
+        for t in deletes
+    ]
+    changes.sort(key=lambda change: change["seq"])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    last = changes[-1]["seq"] if changes else after
+    return changes, encode_change_token(last), has_more
 
 
-def get_batch(db: Session, batch_id: int) -> Optional[Batch]:
+SEARCH_MAX_TERMS = 8
+# Ranking is done over at most this many matches, the newest first. Broad
+# queries ("beef") match a large share of the table, and scoring every match
+# would cost a scan; walking the FTS index in rowid order stops early instead.
+SEARCH_CANDIDATES = int(os.getenv("BATCH_SEARCH_CANDIDATES", "1000"))
+# Which of the SQLite-only tables built by database/migrations.py exist,
+# checked once per name.
+_sqlite_tables: Dict[str, bool] = {}
+
+
+async def _has_sqlite_table(db: AsyncSession, name: str) -> bool:
+    if name not in _sqlite_tables:
+        _sqlite_tables[name] = db.bind.dialect.name == "sqlite" and (
+            await db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": name}
+            )
+        ).first() is not None
+    return _sqlite_tables[name]
+
+
+def _search_terms(q: str) -> List[str]:
+    """Split user input into words, dropping ones with nothing to match on."""
+    terms = [term.replace('"', "") for term in q.split()]
+    return [t for t in terms if any(c.isalnum() for c in t)][:SEARCH_MAX_TERMS]
+
+
+def _fts_match(terms: List[str]) -> str:
+    # Each word becomes a quoted prefix phrase, so "SYN-0012" matches the
+    # tokens syn + 0012* in order and "rib" matches "Ribeye"; words are ANDed.
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _like_prefix(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+async def search_batches(db: AsyncSession, q: str, limit: int = 20) -> List[Batch]:
+    """Find batches whose product or identifier words start with each word of `q`.
+
+    On SQLite this is an FTS5 MATCH: the newest `SEARCH_CANDIDATES` matches
+    are ranked by bm25 (identifier hits weigh double, ties newest first), so
+    the cost is bounded by the candidates, not the table. Other databases use
+    ILIKE, backed on Postgres by the trigram indexes and ranked by similarity.
+    """
+    terms = _search_terms(q)
+    if not terms:
+        return []
+    if await _has_sqlite_table(db, "batches_fts"):
+        candidates = (
+            select(
+                column("rowid").label("id"),
+                literal_column("bm25(batches_fts, 1.0, 2.0)").label("score"),
+            )
+            .select_from(table("batches_fts"))
+            .where(text("batches_fts MATCH :match"))
+            .order_by(column("rowid").desc())
+            .limit(SEARCH_CANDIDATES)
+            .subquery()
+        )
+        query = (
+            select(Batch)
+            .join(candidates, candidates.c.id == Batch.id)
+            .order_by(candidates.c.score, Batch.id.desc())
+            .limit(limit)
+        )
+        result = await db.execute(query, {"match": _fts_match(terms)})
+        return result.scalars().all()
+
+    query = select(Batch).where(
+        and_(
+            *(
+                or_(
+                    Batch.product.ilike(_like_prefix(term), escape="\\"),
+                    Batch.product.ilike("% " + _like_prefix(term), escape="\\"),
+                    Batch.batch_identifier.ilike(_like_prefix(term), escape="\\"),
+                )
+                for term in terms
+            )
+        )
+    )
+    if db.bind.dialect.name == "postgresql":
+        phrase = " ".join(terms)
+        query = query.order_by(
+            func.greatest(
+                func.similarity(Batch.product, phrase),
+                func.similarity(Batch.batch_identifier, phrase),
+            ).desc(),
+            Batch.id,
+        )
+    else:
+        query = query.order_by(Batch.id)
+    result = await db.execute(query.limit(limit))
+    return result.scalars().all()
+
+
+def _freshness_query(today: date):
+    """Select the `BatchWithFreshness` columns, with days on shelf computed in SQL."""
+    days_on_shelf = (
+        literal(today.toordinal(), Integer) - type_coerce(Batch.arrival_date, Integer)
+    ).label("days_on_shelf")
+    return select(
+        Batch.id,
+        Batch.product,
+        Batch.batch_identifier,
+        Batch.butcher_date,
+        Batch.arrival_date,
+        Batch.created_at,
+        days_on_shelf,
+    )
+
+
+async def get_batches_with_freshness(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    min_days: Optional[int] = None,
+    max_days: Optional[int] = None,
+    order: str = "desc",
+) -> List[dict]:
+    """Get batches with `days_on_shelf` computed by the database.
+
+    Days on shelf is today's ordinal minus the stored arrival ordinal, so the
+    whole board is one query. Filters and sorting are expressed on
+    `arrival_date` to use its index; `order` sorts by days on shelf
+    ("desc" = oldest stock first).
+    """
+    today = date.today()
+    query = _freshness_query(today)
+    if min_days is not None:
+        query = query.where(Batch.arrival_date <= today - timedelta(days=min_days))
+    if max_days is not None:
+        query = query.where(Batch.arrival_date >= today - timedelta(days=max_days))
+    if order == "desc":
+        query = query.order_by(Batch.arrival_date.asc(), Batch.id)
+    else:
+        query = query.order_by(Batch.arrival_date.desc(), Batch.id)
+    result = await db.execute(query.offset(skip).limit(limit))
+    return [row._asdict() for row in result]
+
+
+# Freshness buckets by days on shelf, matching the QR report: fresh up to
+# FRESH_MAX_DAYS, aging up to AGING_MAX_DAYS, expired after that.
+FRESH_MAX_DAYS = int(os.getenv("FRESH_MAX_DAYS", "2"))
+AGING_MAX_DAYS = int(os.getenv("AGING_MAX_DAYS", "4"))
+
+
+def _days_since(day: int, arrival) -> Optional[int]:
+    return None if arrival is None else day - int(arrival)
+
+
+# Per-day batch counts kept by triggers on SQLite (see database/migrations.py).
+batch_arrival_counts = table(
+    "batch_arrival_counts",
+    column("product"),
+    column("arrival_date", Integer),
+    column("batches", Integer),
+)
+
+
+async def get_product_freshness_stats(db: AsyncSession, today: date) -> List[dict]:
+    """Per-product batch counts, days-on-shelf range and freshness buckets.
+
+    One `GROUP BY product` query. Every aggregate is over arrival dates (days
+    on shelf is today minus arrival, and the buckets are arrival-date ranges),
+    so on SQLite it reads the per-day `batch_arrival_counts` rollup, a few
+    rows per product and day, instead of the batches. Elsewhere it is one
+    ordered pass over the (product, arrival_date) index of `batches`.
+    """
+    if await _has_sqlite_table(db, "batch_arrival_counts"):
+        source = batch_arrival_counts
+        product, arrival = source.c.product, source.c.arrival_date
+        weight = source.c.batches
+        where = weight > 0
+    else:
+        source = Batch.__table__
+        product, arrival = Batch.product, type_coerce(Batch.arrival_date, Integer)
+        weight = literal(1)
+        where = None
+
+    day = today.toordinal()
+    fresh_from = day - FRESH_MAX_DAYS
+    aging_from = day - AGING_MAX_DAYS
+
+    def bucket(condition):
+        return func.sum(case((condition, weight), else_=0))
+
+    query = (
+        select(
+            product.label("product"),
+            func.sum(weight).label("batches"),
+            func.min(arrival).label("earliest"),
+            (func.sum(arrival * weight) * 1.0 / func.sum(weight)).label("average"),
+            func.max(arrival).label("latest"),
+            bucket(arrival >= fresh_from).label("fresh"),
+            bucket(and_(arrival < fresh_from, arrival >= aging_from)).label("aging"),
+            bucket(arrival < aging_from).label("expired"),
+        )
+        .select_from(source)
+        .group_by(product)
+        .order_by(product)
+    )
+    if where is not None:
+        query = query.where(where)
+    return [
+        {
+            "product": row.product,
+            "batches": row.batches,
+            # The latest arrival has been on the shelf the fewest days.
+            "min_days": _days_since(day, row.latest),
+            "avg_days": (
+                None if row.average is None else round(day - float(row.average), 2)
+            ),
+            "max_days": _days_since(day, row.earliest),
+            "fresh": row.fresh or 0,
+            "aging": row.aging or 0,
+            "expired": row.expired or 0,
+        }
+        for row in await db.execute(query)
+    ]
+
+
+# Expiry alerts (see expiry.py). A batch expires once its days on shelf pass
+# its product's shelf life: PRODUCT_SHELF_LIFE_DAYS entries such as
+# "Ground Beef=2,Bacon=7", else AGING_MAX_DAYS, where the stats call it expired.
+def _parse_shelf_life(spec: str) -> Dict[str, int]:
+    shelf_life: Dict[str, int] = {}
+    for entry in spec.split(","):
+        if "=" in entry:
+            product, days = entry.rsplit("=", 1)
+            shelf_life[product.strip()] = int(days)
+    return shelf_life
+
+
+PRODUCT_SHELF_LIFE_DAYS = _parse_shelf_life(os.getenv("PRODUCT_SHELF_LIFE_DAYS", ""))
+EXPIRY_ALERTS = os.getenv("EXPIRY_ALERTS", "True").lower() == "true"
+
+
+def shelf_life_days(product: Optional[str]) -> int:
+    return PRODUCT_SHELF_LIFE_DAYS.get(product, AGING_MAX_DAYS)
+
+
+def expiry_deadline(product: Optional[str], arrival_date: date) -> float:
+    """Epoch seconds of the local midnight at which a batch becomes expired."""
+    expires_on = arrival_date + timedelta(days=shelf_life_days(product) + 1)
+    return datetime.combine(expires_on, datetime.min.time()).timestamp()
+
+
+def _expiry_alert(row, today: date) -> dict:
+    return {
+        "id": row.id,
+        "product": row.product,
+        "batch_identifier": row.batch_identifier,
+        "arrival_date": row.arrival_date.isoformat(),
+        "days_on_shelf": (today - row.arrival_date).days,
+        "shelf_life_days": shelf_life_days(row.product),
+    }
+
+
+async def _load_upcoming_expiries() -> List[Tuple[float, int]]:
+    """Deadlines of the batches still within their shelf life.
+
+    Only arrivals inside the longest shelf life are read, an index range on
+    `arrival_date`; expired stock is never loaded.
+    """
+    longest = max([AGING_MAX_DAYS, *PRODUCT_SHELF_LIFE_DAYS.values()])
+    since = date.today() - timedelta(days=longest)
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(
+            select(Batch.id, Batch.product, Batch.arrival_date).where(
+                Batch.arrival_date >= since
+            )
+        )
+        return [(expiry_deadline(r.product, r.arrival_date), r.id) for r in rows]
+
+
+async def _check_expiries(ids: List[int]) -> Dict[int, Tuple[float, dict]]:
+    """Current deadline and alert for each of the given batches that still exists."""
+    today = date.today()
+    found: Dict[int, Tuple[float, dict]] = {}
+    async with AsyncSessionLocal() as db:
+        for chunk in _chunks(ids):
+            rows = await db.execute(
+                select(
+                    Batch.id, Batch.product, Batch.batch_identifier, Batch.arrival_date
+                ).where(Batch.id.in_(chunk))
+            )
+            for row in rows:
+                found[row.id] = (
+                    expiry_deadline(row.product, row.arrival_date),
+                    _expiry_alert(row, today),
+                )
+    return found
+
+
+expiry_alerts = ExpiryScheduler(_load_upcoming_expiries, _check_expiries)
+_alert_lock = None
+
+
+def _schedule_expiry(batches: Iterable[Batch]) -> None:
+    if not expiry_alerts.running:
+        return
+    for batch in batches:
+        if batch.arrival_date is not None:
+            expiry_alerts.schedule(
+                batch.id, expiry_deadline(batch.product, batch.arrival_date)
+            )
+
+
+def _hold_alert_lock() -> bool:
+    """Whether this process sends log/webhook alerts.
+
+    With several workers every one of them schedules every batch (the event
+    tailer relays the others' creates), so only the worker holding
+    EXPIRY_ALERTS_LOCK_FILE (set by production mode) sends alerts outside
+    its own event streams. Without fcntl (Windows) every worker sends them.
+    """
+    global _alert_lock
+    path = os.getenv("EXPIRY_ALERTS_LOCK_FILE")
+    if not path or fcntl is None:
+        return True
+    if _alert_lock is None:
+        handle = open(path, "a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        _alert_lock = handle
+    return True
+
+
+def _expiry_sinks() -> list:
+    names = {
+        name.strip().lower()
+        for name in os.getenv("EXPIRY_ALERT_SINKS", "log,sse").split(",")
+        if name.strip()
+    }
+    sinks = []
+    if "sse" in names:
+        sinks.append(EventSink(batch_events))
+    if not _hold_alert_lock():
+        return sinks
+    if "log" in names:
+        sinks.append(LogSink())
+    if "webhook" in names:
+        url = os.getenv("EXPIRY_ALERT_WEBHOOK_URL")
+        if url:
+            sinks.append(WebhookSink(url))
+        else:
+            logger.warning("EXPIRY_ALERT_SINKS has webhook but no EXPIRY_ALERT_WEBHOOK_URL")
+    return sinks
+
+
+async def start_expiry_alerts() -> None:
+    """Startup hook: load upcoming expiries and start the alert scheduler."""
+    if EXPIRY_ALERTS and not expiry_alerts.running:
+        expiry_alerts.sinks = _expiry_sinks()
+        expiry_alerts.start()
+
+
+async def stop_expiry_alerts() -> None:
+    """Shutdown hook: stop the scheduler started by `start_expiry_alerts`."""
+    await expiry_alerts.stop()
+
+
+async def get_batch(db: AsyncSession, batch_id: int) -> Optional[Batch]:
     """Get a specific batch by ID."""
-    return db.query(Batch).filter(Batch.id == batch_id).first()
+    return await db.get(Batch, batch_id)
+
+
+# Built once: the QR-scan path only binds parameters per request.
+_BATCH_FRESHNESS_QUERY = select(
+    Batch.id,
+    Batch.product,
+    Batch.batch_identifier,
+    Batch.butcher_date,
+    Batch.arrival_date,
+    Batch.created_at,
+    (
+        bindparam("today", type_=Integer) - type_coerce(Batch.arrival_date, Integer)
+    ).label("days_on_shelf"),
+    Batch.version,
+).where(Batch.id == bindparam("batch_id"))
+
+
+async def get_batch_freshness(db: AsyncSession, batch_id: int, today: date):
+    """Get one batch as a Core row of its freshness columns plus `version`.
+
+    The QR-scan hot path: no ORM instance or identity-map entry is created,
+    and the row can be serialized as `BatchWithFreshness` directly.
+    """
+    result = await db.execute(
+        _BATCH_FRESHNESS_QUERY, {"batch_id": batch_id, "today": today.toordinal()}
+    )
+    return result.first()
+
+
+EXPORT_COLUMNS = (
+    "id",
+    "product",
+    "batch_identifier",
+    "butcher_date",
+    "arrival_date",
+    "created_at",
+)
+
+
+async def _iter_export_rows(db: AsyncSession, chunk_size: int) -> AsyncIterator[tuple]:
+    """Yield plain column tuples for every batch using a server-side cursor."""
+    columns = [getattr(Batch, name) for name in EXPORT_COLUMNS]
+    query = select(*columns).order_by(Batch.id)
+    result = await db.stream(query.execution_options(yield_per=chunk_size))
+    async for row in result:
+        yield tuple(row)
+
+
+def _export_value(value):
+    if value is None:
+        return None
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+async def export_batches_ndjson(
+    db: AsyncSession, chunk_size: int = 1000
+) -> AsyncIterator[str]:
+    """Stream all batches as newline-delimited JSON, one chunk of rows per yield."""
+    lines: List[str] = []
+    async for row in _iter_export_rows(db, chunk_size):
+        record = dict(zip(EXPORT_COLUMNS, map(_export_value, row)))
+        lines.append(json.dumps(record, separators=(",", ":")))
+        if len(lines) >= chunk_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+async def export_batches_csv(
+    db: AsyncSession, chunk_size: int = 1000
+) -> AsyncIterator[str]:
+    """Stream all batches as CSV with a header row, one chunk of rows per yield."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    # Send the header straight away so clients see the first byte immediately.
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    pending = 0
+    async for row in _iter_export_rows(db, chunk_size):
+        writer.writerow([_export_value(value) for value in row])
+        pending += 1
+        if pending >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
@@ -1,5 +1,30 @@
 """Database package."""
 
-from .core import engine, Base, SessionLocal, get_db
+from .core import (
+    engine,
+    async_engine,
+    Base,
+    SessionLocal,
+    AsyncSessionLocal,
+    get_db,
+    get_async_db,
+    SQLITE_PRAGMAS,
+)
+from .migrations import init_database, run_migrations
+from .profiling import record_queries
+from .types import DayOrdinal
 
-__all__ = ["engine", "Base", "SessionLocal", "get_db"]
+__all__ = [
+    "engine",
+    "async_engine",
+    "Base",
+    "SessionLocal",
+    "AsyncSessionLocal",
+    "get_db",
+    "get_async_db",
+    "SQLITE_PRAGMAS",
+    "init_database",
+    "run_migrations",
+    "record_queries",
+    "DayOrdinal",
+]
@@ -2,21 +2,74 @@
 
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from dotenv import load_dotenv
 
+from .profiling import track_queries
+from .sqlite import apply_sqlite_pragmas, load_sqlite_pragmas
+
 # Load environment variables from .env file
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./freshness.db")
 
+# Async drivers for the request path, keyed by the sync URL scheme.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Return the async-driver equivalent of a sync database URL."""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database URL scheme {scheme!r}")
+    return f"{ASYNC_DRIVERS[dialect]}{sep}{rest}"
+
+
+SQLALCHEMY_ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL", async_database_url(SQLALCHEMY_DATABASE_URL)
+)
+
+# Sync engine: schema creation, migrations and scripts.
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: every API request.
+async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL)
+AsyncSessionLocal = sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+SQLITE_PRAGMAS = {}
+if engine.dialect.name == "sqlite":
+    SQLITE_PRAGMAS = load_sqlite_pragmas()
+    apply_sqlite_pragmas(engine, SQLITE_PRAGMAS)
+    apply_sqlite_pragmas(async_engine.sync_engine, SQLITE_PRAGMAS)
+
+# Per-request statement counts and timings (see database/profiling.py).
+track_queries(engine)
+track_queries(async_engine.sync_engine)
+
+
+def _dispose_pools_after_fork() -> None:
+    # A forked worker must not reuse the parent's pooled connections; drop the
+    # pools without closing the sockets/files the parent still owns.
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_pools_after_fork)
+
 Base = declarative_base()
 
 
@@ -27,3 +80,9 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency that yields an AsyncSession and ensures it is closed."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,319 @@
+"""In-place schema migrations for existing databases.
+
+`Base.metadata.create_all` only creates missing tables, so changes to existing
+tables are applied here at startup. Each migration checks the live schema first
+and is a no-op once applied.
+"""
+
+from sqlalchemy import Integer, inspect
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+
+from .core import Base
+from .types import JULIAN_DAY_OFFSET
+
+DATE_COLUMNS = ("butcher_date", "arrival_date")
+# Rows listed when a migration refuses to run because of bad data.
+MAX_REPORTED_ROWS = 20
+
+
+def _batch_columns(conn: Connection) -> dict:
+    return {c["name"]: c["type"] for c in inspect(conn).get_columns("batches")}
+
+
+def _batch_dates_are_text(conn: Connection) -> bool:
+    columns = _batch_columns(conn)
+    return any(
+        name in columns and not isinstance(columns[name], Integer)
+        for name in DATE_COLUMNS
+    )
+
+
+def _rebuild_batches(conn: Connection, columns: dict) -> None:
+    """Recreate `batches` from the model, copying its rows across (SQLite only).
+
+    SQLite cannot change a column's type or the primary key in place, so the
+    table is renamed, recreated from the model and the rows copied with
+    `columns` (new column -> SQL expression over the old row). The old
+    table's triggers go with it; the startup steps after this rebuild the
+    search index and arrival counts. Runs in the caller's transaction.
+    """
+    from models.batch import Batch
+
+    legacy = "_batches_legacy"
+    conn.exec_driver_sql(f"ALTER TABLE batches RENAME TO {legacy}")
+    # Indexes follow the renamed table; drop them so the new ones can be created.
+    index_names = conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? "
+        "AND sql IS NOT NULL",
+        (legacy,),
+    ).scalars().all()
+    for name in index_names:
+        conn.exec_driver_sql(f'DROP INDEX "{name}"')
+
+    Batch.__table__.create(conn)
+    conn.exec_driver_sql(
+        f"INSERT INTO batches ({', '.join(columns)}) "
+        f"SELECT {', '.join(columns.values())} FROM {legacy}"
+    )
+    conn.exec_driver_sql(f"DROP TABLE {legacy}")
+
+
+def _unconvertible_batch_dates(conn: Connection) -> list:
+    """Rows whose stored dates julianday() cannot read, which would become NULL."""
+    condition = " OR ".join(
+        f"({name} IS NOT NULL AND julianday({name}) IS NULL)" for name in DATE_COLUMNS
+    )
+    return conn.exec_driver_sql(
+        f"SELECT id, batch_identifier, {', '.join(DATE_COLUMNS)} FROM batches "
+        f"WHERE {condition} ORDER BY id"
+    ).all()
+
+
+def _migrate_batch_dates(conn: Connection) -> None:
+    """Rebuild `batches` with integer day-ordinal date columns (SQLite only).
+
+    The ISO date strings are converted by julianday(). Dates it cannot read
+    would be lost, so if there are any the migration stops before changing
+    anything and lists the rows to correct.
+    """
+    bad = _unconvertible_batch_dates(conn)
+    if bad:
+        shown = "\n".join(
+            f"  id={row.id} batch_identifier={row.batch_identifier!r} "
+            f"butcher_date={row.butcher_date!r} arrival_date={row.arrival_date!r}"
+            for row in bad[:MAX_REPORTED_ROWS]
+        )
+        more = len(bad) - MAX_REPORTED_ROWS
+        raise RuntimeError(
+            f"Cannot migrate batches dates: {len(bad)} row(s) have dates that are "
+            "not YYYY-MM-DD. Correct them to YYYY-MM-DD and restart; "
+            f"nothing was changed.\n{shown}"
+            + (f"\n  ... and {more} more" if more > 0 else "")
+        )
+    columns = {
+        name: name for name in ("id", "product", "batch_identifier", "created_at")
+    }
+    for name in DATE_COLUMNS:
+        columns[name] = f"CAST(julianday({name}) - {JULIAN_DAY_OFFSET} AS INTEGER)"
+    _rebuild_batches(conn, columns)
+
+
+def _batch_ids_autoincrement(conn: Connection) -> bool:
+    table_sql = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'batches'"
+    ).scalar()
+    return "AUTOINCREMENT" in table_sql.upper()
+
+
+def _migrate_batch_autoincrement(conn: Connection) -> None:
+    """Rebuild `batches` with AUTOINCREMENT ids (SQLite only).
+
+    Without it SQLite hands the id of a deleted highest row to the next
+    insert, and a new batch would then match the old one's ETags and be
+    skipped by the worker event tailer (`id > last_id`). The id sequence is
+    started past every id still named by a tombstone.
+    """
+    _rebuild_batches(conn, {name: name for name in _batch_columns(conn)})
+    conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'batches'")
+    conn.exec_driver_sql(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'batches', MAX("
+        "(SELECT COALESCE(MAX(id), 0) FROM batches), "
+        "(SELECT COALESCE(MAX(batch_id), 0) FROM batch_tombstones))"
+    )
+
+
+# Search index for GET /batches/search. On SQLite, an external-content FTS5
+# table over `batches` (no second copy of the text) kept in sync by triggers,
+# so every write path, ORM or executemany, indexes the row in the same
+# transaction. `prefix` adds index entries for 1-6 character prefixes, so a
+# partly typed word or identifier reads one doclist instead of merging those
+# of every term it starts (on 1M batches: ~1 ms instead of ~30 ms).
+BATCH_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS batches_fts USING fts5("
+    "product, batch_identifier, content='batches', content_rowid='id', "
+    "prefix='1 2 3 4 5 6')",
+    "CREATE TRIGGER IF NOT EXISTS batches_fts_insert AFTER INSERT ON batches BEGIN "
+    "INSERT INTO batches_fts (rowid, product, batch_identifier) "
+    "VALUES (new.id, new.product, new.batch_identifier); END",
+    "CREATE TRIGGER IF NOT EXISTS batches_fts_delete AFTER DELETE ON batches BEGIN "
+    "INSERT INTO batches_fts (batches_fts, rowid, product, batch_identifier) "
+    "VALUES ('delete', old.id, old.product, old.batch_identifier); END",
+    "CREATE TRIGGER IF NOT EXISTS batches_fts_update "
+    "AFTER UPDATE OF product, batch_identifier ON batches BEGIN "
+    "INSERT INTO batches_fts (batches_fts, rowid, product, batch_identifier) "
+    "VALUES ('delete', old.id, old.product, old.batch_identifier); "
+    "INSERT INTO batches_fts (rowid, product, batch_identifier) "
+    "VALUES (new.id, new.product, new.batch_identifier); END",
+)
+BATCH_FTS_OBJECTS = (
+    "batches_fts", "batches_fts_insert", "batches_fts_delete", "batches_fts_update",
+)
+# On Postgres, trigram GIN indexes serve the ILIKE prefix/substring matches.
+BATCH_TRGM_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_batches_product_trgm "
+    "ON batches USING gin (product gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_batches_batch_identifier_trgm "
+    "ON batches USING gin (batch_identifier gin_trgm_ops)",
+)
+
+
+# Batch counts per (product, arrival_date) for GET /batches/stats, kept by
+# triggers on SQLite. The stats query groups this rollup (products x days
+# rows) instead of scanning every batch: ~5 ms instead of ~400 ms on 1M
+# batches. Rows are not removed when their count drops to 0.
+BATCH_ARRIVAL_COUNTS_DDL = (
+    "CREATE TABLE IF NOT EXISTS batch_arrival_counts ("
+    "product VARCHAR, arrival_date INTEGER, batches INTEGER NOT NULL, "
+    "UNIQUE (product, arrival_date))",
+    "CREATE TRIGGER IF NOT EXISTS batch_arrival_counts_insert "
+    "AFTER INSERT ON batches BEGIN "
+    "INSERT INTO batch_arrival_counts (product, arrival_date, batches) "
+    "VALUES (new.product, new.arrival_date, 1) "
+    "ON CONFLICT (product, arrival_date) DO UPDATE SET batches = batches + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS batch_arrival_counts_delete "
+    "AFTER DELETE ON batches BEGIN "
+    "UPDATE batch_arrival_counts SET batches = batches - 1 WHERE rowid = ("
+    "SELECT rowid FROM batch_arrival_counts WHERE product IS old.product "
+    "AND arrival_date IS old.arrival_date LIMIT 1); END",
+    "CREATE TRIGGER IF NOT EXISTS batch_arrival_counts_update "
+    "AFTER UPDATE OF product, arrival_date ON batches BEGIN "
+    "UPDATE batch_arrival_counts SET batches = batches - 1 WHERE rowid = ("
+    "SELECT rowid FROM batch_arrival_counts WHERE product IS old.product "
+    "AND arrival_date IS old.arrival_date LIMIT 1); "
+    "INSERT INTO batch_arrival_counts (product, arrival_date, batches) "
+    "VALUES (new.product, new.arrival_date, 1) "
+    "ON CONFLICT (product, arrival_date) DO UPDATE SET batches = batches + 1; END",
+)
+BATCH_ARRIVAL_COUNTS_OBJECTS = (
+    "batch_arrival_counts",
+    "batch_arrival_counts_insert",
+    "batch_arrival_counts_delete",
+    "batch_arrival_counts_update",
+)
+
+
+def _missing_objects(conn: Connection, names) -> set:
+    present = conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE name IN "
+        f"({', '.join('?' for _ in names)})",
+        tuple(names),
+    ).scalars().all()
+    return set(names) - set(present)
+
+
+def ensure_batch_search(conn: Connection) -> None:
+    """Create the batch search index if missing, filling it from `batches`.
+
+    On SQLite a missing sync trigger also triggers a full rebuild, which is
+    how bulk loaders that drop the triggers bring the index back in one pass.
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        if not _missing_objects(conn, BATCH_FTS_OBJECTS):
+            return
+        try:
+            for statement in BATCH_FTS_DDL:
+                conn.exec_driver_sql(statement)
+        except OperationalError as e:  # SQLite built without FTS5
+            print(f"[startup] Batch search index unavailable: {e}")
+            return
+        conn.exec_driver_sql("INSERT INTO batches_fts (batches_fts) VALUES ('rebuild')")
+        print("[startup] Built batches full-text search index")
+    elif dialect == "postgresql":
+        for statement in BATCH_TRGM_DDL:
+            conn.exec_driver_sql(statement)
+
+
+def ensure_batch_arrival_counts(conn: Connection) -> None:
+    """Create the SQLite per-day batch count rollup if missing, and (re)fill it.
+
+    Like the search index, a missing trigger means the rollup may be stale,
+    so it is recounted from `batches`.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    if not _missing_objects(conn, BATCH_ARRIVAL_COUNTS_OBJECTS):
+        return
+    for statement in BATCH_ARRIVAL_COUNTS_DDL:
+        conn.exec_driver_sql(statement)
+    conn.exec_driver_sql("DELETE FROM batch_arrival_counts")
+    conn.exec_driver_sql(
+        "INSERT INTO batch_arrival_counts (product, arrival_date, batches) "
+        "SELECT product, arrival_date, COUNT(*) FROM batches "
+        "GROUP BY product, arrival_date"
+    )
+    print("[startup] Built batch arrival counts")
+
+
+# Indexes older schemas created that newer ones cover: ix_batches_product is
+# the leading column of ix_batches_product_arrival_date.
+REDUNDANT_BATCH_INDEXES = ("ix_batches_product",)
+
+
+def _ensure_batch_indexes(conn: Connection) -> None:
+    """Create model indexes added after the `batches` table was created, and
+    drop the ones they made redundant."""
+    from models.batch import Batch
+
+    existing = {index["name"] for index in inspect(conn).get_indexes("batches")}
+    for index in Batch.__table__.indexes:
+        if index.name not in existing:
+            index.create(conn)
+            print(f"[startup] Created index {index.name}")
+    for name in REDUNDANT_BATCH_INDEXES:
+        if name in existing:
+            conn.exec_driver_sql(f'DROP INDEX "{name}"')
+            print(f"[startup] Dropped redundant index {name}")
+
+
+def run_migrations(engine: Engine, derived: bool = True) -> None:
+    """Apply any pending migrations to the database behind `engine`.
+
+    `derived=False` skips (re)building the batch search index and arrival
+    counts, for bulk loaders that rebuild them after loading or leave them to
+    the next start.
+    """
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite" and _batch_dates_are_text(conn):
+            _migrate_batch_dates(conn)
+            print("[startup] Migrated batches dates to indexed day ordinals")
+        if engine.dialect.name == "sqlite" and not _batch_ids_autoincrement(conn):
+            _migrate_batch_autoincrement(conn)
+            print("[startup] Rebuilt batches with ids that are never reused")
+        if "version" not in _batch_columns(conn):
+            conn.exec_driver_sql(
+                "ALTER TABLE batches ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+            )
+            print("[startup] Added batches.version column")
+        if "change_seq" not in _batch_columns(conn):
+            conn.exec_driver_sql("ALTER TABLE batches ADD COLUMN change_seq INTEGER")
+            conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_batches_change_seq ON batches (change_seq)"
+            )
+            print("[startup] Added batches.change_seq column")
+        # Rows that predate the change feed (or came through the dates rebuild
+        # above) join it in id order.
+        if conn.exec_driver_sql(
+            "SELECT 1 FROM batches WHERE change_seq IS NULL LIMIT 1"
+        ).first():
+            conn.exec_driver_sql(
+                "UPDATE batches SET change_seq = id WHERE change_seq IS NULL"
+            )
+            print("[startup] Assigned change_seq to existing batches")
+        if derived:
+            ensure_batch_search(conn)
+            ensure_batch_arrival_counts(conn)
+        _ensure_batch_indexes(conn)
+
+
+def init_database(engine: Engine, derived: bool = True) -> None:
+    """Create missing tables, then apply pending migrations.
+
+    Run once per process at startup, after the models have been imported so
+    their tables are registered on `Base.metadata`. See `run_migrations` for
+    `derived`.
+    """
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine, derived)
@@ -0,0 +1,93 @@
+"""Per-request SQL statement counting and timing.
+
+`track_queries(engine)` hooks the engine's before/after_cursor_execute events.
+Each statement is charged to the `QueryStats` bound to `current_queries` in
+the current context (e.g. by a `record_queries()` block), so concurrent
+requests do not see each other's queries. The async engine's statements run
+in greenlets spawned from the request's task and inherit its context.
+Statements run with nothing bound (startup, migrations) are not counted.
+
+The API's MetricsMiddleware binds one `QueryStats` per request and reports
+the totals in a `Server-Timing: db;dur=<ms>;desc="<n> queries"` header. Tests
+can then check any response with `assert_max_queries`, as
+benchmarks/query_budget.py does for the main endpoints.
+"""
+
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def server_timing(self) -> str:
+        """Server-Timing metric for these queries (duration in milliseconds)."""
+        return f'db;dur={self.seconds * 1000:.2f};desc="{self.count} queries"'
+
+
+current_queries: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_queries", default=None
+)
+
+
+@contextmanager
+def record_queries() -> Iterator[QueryStats]:
+    """Count and time the statements executed in this context while open."""
+    stats = QueryStats()
+    token = current_queries.set(stats)
+    try:
+        yield stats
+    finally:
+        current_queries.reset(token)
+
+
+def track_queries(engine: Engine) -> None:
+    """Charge every statement on `engine` to the active `record_queries` block."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if current_queries.get() is not None:
+            conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = current_queries.get()
+        started = conn.info.pop("query_start", None)
+        if stats is not None and started is not None:
+            stats.count += 1
+            stats.seconds += time.perf_counter() - started
+
+
+_QUERY_COUNT = re.compile(r'(?:^|,)\s*db;[^,]*desc="(\d+) queries"')
+
+
+def query_count(response) -> int:
+    """Statements a response's request executed, from its Server-Timing header."""
+    match = _QUERY_COUNT.search(response.headers.get("server-timing", ""))
+    if match is None:
+        raise AssertionError("Response has no db Server-Timing metric")
+    return int(match.group(1))
+
+
+def assert_max_queries(response, limit: int) -> None:
+    """Fail if the request behind `response` ran more than `limit` statements.
+
+    Guards endpoints against N+1 regressions, e.g.:
+        assert_max_queries(client.get(f"/batches/{batch_id}"), 1)
+    """
+    count = query_count(response)
+    if count > limit:
+        raise AssertionError(
+            f"{response.request.method} {response.request.url.path} ran "
+            f"{count} queries, expected at most {limit}"
+        )
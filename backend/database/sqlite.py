@@ -0,0 +1,61 @@
+"""SQLite tuning profile applied to every new connection.
+
+Each PRAGMA can be overridden from the environment; set a variable to an empty
+string to leave SQLite's own default in place.
+"""
+
+import os
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# PRAGMA name -> (environment variable, default, allowed values or int)
+SQLITE_PRAGMA_SETTINGS = {
+    "journal_mode": (
+        "SQLITE_JOURNAL_MODE",
+        "WAL",
+        {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+    ),
+    "synchronous": ("SQLITE_SYNCHRONOUS", "NORMAL", {"OFF", "NORMAL", "FULL", "EXTRA"}),
+    "busy_timeout": ("SQLITE_BUSY_TIMEOUT_MS", "5000", int),
+    "cache_size": ("SQLITE_CACHE_SIZE", "-20000", int),  # negative = KiB
+    "mmap_size": ("SQLITE_MMAP_SIZE", "268435456", int),
+    "temp_store": ("SQLITE_TEMP_STORE", "MEMORY", {"DEFAULT", "FILE", "MEMORY"}),
+}
+
+
+def load_sqlite_pragmas() -> Dict[str, str]:
+    """Read the PRAGMA profile from the environment. Raises ValueError on bad values."""
+    pragmas: Dict[str, str] = {}
+    for name, (env_var, default, allowed) in SQLITE_PRAGMA_SETTINGS.items():
+        value = os.getenv(env_var, default).strip()
+        if not value:
+            continue
+        if allowed is int:
+            try:
+                value = str(int(value))
+            except ValueError:
+                raise ValueError(f"{env_var} must be an integer, got {value!r}")
+        else:
+            value = value.upper()
+            if value not in allowed:
+                raise ValueError(
+                    f"{env_var} must be one of {sorted(allowed)}, got {value!r}"
+                )
+        pragmas[name] = value
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine: Engine, pragmas: Dict[str, str]) -> None:
+    """Run the given PRAGMAs on every connection the engine opens."""
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            # busy_timeout first, so switching journal_mode can wait on a lock.
+            for name in sorted(pragmas, key=lambda n: n != "busy_timeout"):
+                cursor.execute(f"PRAGMA {name} = {pragmas[name]}")
+        finally:
+            cursor.close()
@@ -0,0 +1,31 @@
+"""Custom SQLAlchemy column types."""
+
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import Integer
+from sqlalchemy.types import TypeDecorator
+
+# julianday() of 0001-01-01 minus 1, so SQLite can convert ISO text to ordinals.
+JULIAN_DAY_OFFSET = 1721424.5
+
+
+class DayOrdinal(TypeDecorator):
+    """A calendar date stored as its proleptic Gregorian ordinal (`date.toordinal()`).
+
+    Ordinals are plain integers on every backend, so range filters hit a
+    normal index and "days since" is simple subtraction, in Python or in SQL.
+    """
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[date], dialect) -> Optional[int]:
+        if value is None:
+            return None
+        return value.toordinal()
+
+    def process_result_value(self, value: Optional[int], dialect) -> Optional[date]:
+        if value is None:
+            return None
+        return date.fromordinal(value)
@@ -0,0 +1,143 @@
+"""In-process change events fanned out to Server-Sent Events subscribers.
+
+`EventBroker.publish` encodes an event once as an SSE frame and offers the
+same bytes to every subscriber, so one change costs a single JSON encode no
+matter how many displays are connected. Each subscriber has its own bounded
+queue. A subscriber that falls `queue_size` frames behind (a stalled tablet)
+has its backlog dropped and gets a single `reset` event instead, telling the
+client to reload; a slow reader never holds memory or blocks the publisher.
+
+The last `history` frames are kept so a client reconnecting with
+Last-Event-ID gets what it missed, or `reset` when that is no longer
+available. Event ids are `<epoch>-<n>`: a counter per broker, prefixed with a
+random token drawn when the broker is created. An id from another epoch (a
+different worker, or this one before a restart) says nothing about which of
+this broker's events the client has seen, so it always gets `reset`.
+"""
+
+import asyncio
+import json
+import secrets
+from collections import deque
+from typing import AsyncIterator, Deque, List, Optional, Set, Tuple
+
+Frame = Tuple[int, bytes]
+
+HEARTBEAT = b": ping\n\n"
+
+
+def _frame(event_id: str, event: str, data) -> bytes:
+    payload = json.dumps(data, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class Subscriber:
+    """One connected client's bounded queue of encoded frames."""
+
+    def __init__(self, broker: "EventBroker", queue_size: int):
+        self.broker = broker
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def offer(self, frame: Frame) -> None:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Too far behind: replace the backlog with one reset.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.broker.overflows += 1
+            self.queue.put_nowait(self.broker.reset_frame())
+
+    async def frames(self, heartbeat: float) -> AsyncIterator[bytes]:
+        """Yield SSE frames, with a comment line after `heartbeat` idle seconds."""
+        while True:
+            try:
+                _, frame = await asyncio.wait_for(self.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+            yield frame
+
+
+class BrokerFullError(RuntimeError):
+    """Raised when the broker already has `max_subscribers` subscribers."""
+
+
+class EventBroker:
+    """Publishes change events to every connected subscriber of this process."""
+
+    def __init__(self, queue_size: int, history: int, max_subscribers: int):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers: Set[Subscriber] = set()
+        self._history: Deque[Frame] = deque(maxlen=history)
+        self.epoch = secrets.token_hex(4)
+        self._last_id = 0
+        self.published = 0
+        self.overflows = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def _next_id(self) -> int:
+        self._last_id += 1
+        return self._last_id
+
+    def _wire_id(self, n: int) -> str:
+        return f"{self.epoch}-{n}"
+
+    def _parse_id(self, event_id: str) -> Optional[int]:
+        """This broker's counter from a Last-Event-ID, or None if it is not ours."""
+        epoch, _, n = event_id.partition("-")
+        if epoch != self.epoch or not n.isdigit():
+            return None
+        return int(n)
+
+    def reset_frame(self) -> Frame:
+        # Carries the current id so the client resumes from here after reloading.
+        return self._last_id, _frame(self._wire_id(self._last_id), "reset", {})
+
+    def publish(self, event: str, data) -> None:
+        """Encode an event and offer it to every subscriber without waiting."""
+        event_id = self._next_id()
+        frame = (event_id, _frame(self._wire_id(event_id), event, data))
+        self._history.append(frame)
+        self.published += 1
+        for subscriber in self._subscribers:
+            subscriber.offer(frame)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscriber:
+        """Register a subscriber, replaying frames after `last_event_id` if known."""
+        if len(self._subscribers) >= self.max_subscribers:
+            raise BrokerFullError("Too many event stream clients, try again shortly")
+        subscriber = Subscriber(self, self.queue_size)
+        last_id = self._parse_id(last_event_id) if last_event_id else None
+        if last_event_id and last_id is None:
+            # From another epoch (process or restart), or not an id at all.
+            subscriber.offer(self.reset_frame())
+        elif last_id is not None and last_id != self._last_id:
+            missed: List[Frame] = [f for f in self._history if f[0] > last_id]
+            if last_id > self._last_id or not missed or missed[0][0] != last_id + 1:
+                # History rolled over.
+                subscriber.offer(self.reset_frame())
+            else:
+                for frame in missed:
+                    subscriber.offer(frame)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def stats(self) -> dict:
+        """Subscriber and event counters for diagnostics."""
+        return {
+            "subscribers": len(self._subscribers),
+            "max_subscribers": self.max_subscribers,
+            "queue_size": self.queue_size,
+            "epoch": self.epoch,
+            "last_event_id": self._wire_id(self._last_id),
+            "published": self.published,
+            "overflows": self.overflows,
+        }
@@ -0,0 +1,190 @@
+"""Expiry alerts: tell someone when a batch passes its shelf life.
+
+`ExpiryScheduler` keeps every upcoming expiry in a min-heap of
+(deadline, batch id) and sleeps until the earliest deadline instead of
+polling the table. Newly created batches are pushed in O(log n) and only
+wake the loop when they expire before whatever it is waiting for.
+
+When deadlines pass, the due batches are re-read through `check`, so a batch
+deleted (or re-dated) since it was scheduled is dropped or rescheduled
+rather than reported, and the rest go to every sink as one list of alerts.
+A sink is any `async (alerts) -> None` callable; `LogSink`, `WebhookSink`
+and `EventSink` are provided. Deadlines are only tracked while running: a
+batch that expired while the server was down, or was entered already
+expired, is not alerted on.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import time
+import urllib.request
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from events import EventBroker
+
+logger = logging.getLogger(__name__)
+
+Alert = dict
+Sink = Callable[[List[Alert]], Awaitable[None]]
+# Deadlines are epoch seconds (time.time()).
+Upcoming = Iterable[Tuple[float, int]]
+
+
+class LogSink:
+    """Log one warning per expired batch."""
+
+    async def __call__(self, alerts: List[Alert]) -> None:
+        for alert in alerts:
+            logger.warning(
+                "Batch %s (%s) expired after %s days on shelf",
+                alert["batch_identifier"],
+                alert["product"],
+                alert["days_on_shelf"],
+            )
+
+
+class WebhookSink:
+    """POST the alerts as a JSON list to `url` (in a thread, stdlib only)."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def _post(self, body: bytes) -> None:
+        request = urllib.request.Request(
+            self.url, data=body, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    async def __call__(self, alerts: List[Alert]) -> None:
+        body = json.dumps(alerts, separators=(",", ":")).encode("utf-8")
+        await asyncio.to_thread(self._post, body)
+
+
+class EventSink:
+    """Publish the alerts as one `expired` event to an event broker."""
+
+    def __init__(self, broker: EventBroker):
+        self.broker = broker
+
+    async def __call__(self, alerts: List[Alert]) -> None:
+        self.broker.publish("expired", alerts)
+
+
+class ExpiryScheduler:
+    """Sleeps until the next batch expiry and sends alerts to its sinks.
+
+    `load()` returns the (deadline, batch id) pairs to start from;
+    `check(ids)` returns `{id: (deadline, alert)}` for the given batches that
+    still exist, with their current deadline.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[], Awaitable[Upcoming]],
+        check: Callable[[List[int]], Awaitable[Dict[int, Tuple[float, Alert]]]],
+        sinks: Sequence[Sink] = (),
+        max_sleep: float = 3600.0,
+    ):
+        self.load = load
+        self.check = check
+        self.sinks = list(sinks)
+        # Wake at least this often, so wall-clock changes are picked up.
+        self.max_sleep = max_sleep
+        self._heap: List[Tuple[float, int]] = []
+        # The live deadline per batch; heap entries that disagree are stale.
+        self._deadlines: Dict[int, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.alerts = 0
+        self.sink_errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def schedule(self, batch_id: int, deadline: float) -> None:
+        """Track (or move) a batch's expiry; ignored if it is already past."""
+        if self._task is None or deadline <= time.time():
+            return
+        self._deadlines[batch_id] = deadline
+        heapq.heappush(self._heap, (deadline, batch_id))
+        if self._heap[0] == (deadline, batch_id):
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self._heap.clear()
+            self._deadlines.clear()
+
+    def _pop_due(self, now: float) -> List[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, batch_id = heapq.heappop(self._heap)
+            if self._deadlines.get(batch_id) == deadline:
+                del self._deadlines[batch_id]
+                due.append(batch_id)
+        return due
+
+    async def _run(self) -> None:
+        for deadline, batch_id in await self.load():
+            self.schedule(batch_id, deadline)
+        while True:
+            due = self._pop_due(time.time())
+            if due:
+                try:
+                    await self._fire(due)
+                except Exception:
+                    logger.exception("Sending expiry alerts failed")
+                continue
+            timeout = self.max_sleep
+            if self._heap:
+                timeout = min(timeout, self._heap[0][0] - time.time())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, due: List[int]) -> None:
+        now = time.time()
+        alerts = []
+        for batch_id, (deadline, alert) in (await self.check(due)).items():
+            if deadline <= now:
+                alerts.append(alert)
+            else:
+                self.schedule(batch_id, deadline)
+        if not alerts:
+            return
+        self.alerts += len(alerts)
+        for sink in self.sinks:
+            try:
+                await sink(alerts)
+            except Exception:
+                self.sink_errors += 1
+                logger.exception("Expiry alert sink %r failed", sink)
+
+    def stats(self) -> dict:
+        """Heap and alert counters for diagnostics."""
+        next_deadline = min(self._deadlines.values(), default=None)
+        return {
+            "running": self.running,
+            "scheduled": len(self._deadlines),
+            "heap_entries": len(self._heap),
+            "next_deadline": next_deadline,
+            "seconds_to_next": (
+                round(next_deadline - time.time(), 1) if next_deadline else None
+            ),
+            "alerts": self.alerts,
+            "sink_errors": self.sink_errors,
+            "sinks": [type(sink).__name__ for sink in self.sinks],
+        }
@@ -0,0 +1,112 @@
+"""Group commit: coalesce concurrent single-row writes into one transaction.
+
+On SQLite every commit is an fsync under a database-wide write lock, so many
+concurrent one-row transactions queue behind each other. `GroupCommitQueue`
+collects items submitted by concurrent requests for up to `window` seconds
+(or until `max_size` items are waiting) and hands them to one `commit_group`
+call. While a group is being committed, new items keep gathering and go out
+as the next group as soon as it finishes, so under load groups grow by
+themselves and a lone writer waits at most `window`.
+
+`commit_group(items)` returns one outcome per item, in order; an outcome that
+is an Exception is raised to that item's caller only, anything else is
+returned to it. If `commit_group` itself raises, every caller in the group
+gets that error. Groups are committed outside any caller's context, so
+per-request context variables do not see the group's work.
+"""
+
+import asyncio
+import contextvars
+from typing import Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class GroupCommitQueue(Generic[T, R]):
+    """Coalesces concurrent `submit` calls into batched `commit_group` calls."""
+
+    def __init__(
+        self,
+        commit_group: Callable[[List[T]], Awaitable[List[object]]],
+        window: float,
+        max_size: int,
+    ):
+        self.commit_group = commit_group
+        self.window = window
+        self.max_size = max_size
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._writing = False
+        self._tasks: Set[asyncio.Task] = set()
+        self.groups = 0
+        self.items = 0
+        self.largest_group = 0
+
+    async def submit(self, item: T) -> R:
+        """Queue one item and wait for the outcome of the group it lands in."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if self.window <= 0 or len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(
+                self.window, self._flush, context=contextvars.Context()
+            )
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._writing or not self._pending:
+            # The running writer takes whatever is pending when it finishes.
+            return
+        self._writing = True
+        # Run the writer in an empty context: it works for every caller in
+        # the group, so it must not inherit per-request context variables
+        # (such as the query counter) from whichever request started it.
+        task = contextvars.Context().run(asyncio.ensure_future, self._drain())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self) -> None:
+        try:
+            while self._pending:
+                group = self._pending[: self.max_size]
+                del self._pending[: self.max_size]
+                await self._commit(group)
+        finally:
+            self._writing = False
+
+    async def _commit(self, group: List[Tuple[T, asyncio.Future]]) -> None:
+        self.groups += 1
+        self.items += len(group)
+        self.largest_group = max(self.largest_group, len(group))
+        try:
+            outcomes = await self.commit_group([item for item, _ in group])
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), outcome in zip(group, outcomes):
+            if future.done():  # caller went away
+                continue
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+    def stats(self) -> dict:
+        """Group counters for diagnostics."""
+        return {
+            "window_ms": self.window * 1000,
+            "max_size": self.max_size,
+            "pending": len(self._pending),
+            "groups": self.groups,
+            "items": self.items,
+            "largest_group": self.largest_group,
+            "average_group": round(self.items / self.groups, 2) if self.groups else 0.0,
+        }
@@ -10,19 +10,24 @@ Main capabilities:
 - ensure_portproxy(): Configure Windows portproxy to forward Wi‑Fi_IP:port → WSL_IP:port.
 - ensure_firewall_port(): Ensure a Windows firewall inbound rule for a TCP port.
 - update_env_var(), update_env_host(): Update backend/.env values.
+- discover_addresses(): Run several of the IP probes above concurrently, with a
+  shared timeout, caching answers on disk for LAN_IP_CACHE_TTL seconds.
 
 Notes:
 - "Real LAN" is treated as 192.168.0.x or 192.168.1.x to simplify mobile access.
 - Portproxy/firewall helpers attempt elevation via PowerShell when needed.
 """
 
+import json
 import os
 import re
 import subprocess
 import socket
 import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, Dict, Iterable, Optional, Tuple
 
 try:
     import psutil  # type: ignore
@@ -231,6 +236,90 @@ def ensure_firewall_port(port: int, name: str = "Freshness Tracker Backend") ->
     return False, f"failed to add firewall rule: {err}"
 
 
+# -------------------------
+# Concurrent, cached discovery
+# -------------------------
+
+DISCOVERY_CACHE_PATH = Path(__file__).parent / ".lan_ip_cache.json"
+
+
+DISCOVERY_PROBES: Dict[str, Callable[[], Optional[str]]] = {
+    "windows_wifi_ip": get_windows_wifi_ip,
+    "lan_ip": get_lan_ip,
+    "wsl_ip": get_wsl_ip,
+}
+
+
+def _read_discovery_cache(path: Path, ttl: float) -> Dict[str, str]:
+    try:
+        entries = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    now = time.time()
+    return {
+        name: entry["value"]
+        for name, entry in entries.items()
+        if isinstance(entry, dict) and now - entry.get("at", 0) < ttl
+    }
+
+
+def _write_discovery_cache(path: Path, values: Dict[str, str]) -> None:
+    try:
+        entries = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        entries = {}
+    now = time.time()
+    entries.update({name: {"value": value, "at": now} for name, value in values.items()})
+    try:
+        path.write_text(json.dumps(entries, indent=2) + "\n", encoding="utf-8")
+    except Exception:
+        pass
+
+
+def discover_addresses(
+    names: Iterable[str],
+    timeout: Optional[float] = None,
+    cache_ttl: Optional[float] = None,
+    cache_path: Path = DISCOVERY_CACHE_PATH,
+) -> Dict[str, Optional[str]]:
+    """Run the named probes ("windows_wifi_ip", "lan_ip", "wsl_ip") concurrently.
+
+    Answers younger than `cache_ttl` seconds (LAN_IP_CACHE_TTL, default 600;
+    0 disables the cache) are served from `cache_path` without probing. Probes
+    still running after `timeout` seconds (LAN_IP_TIMEOUT, default 5) count as
+    not found. Failed probes are never cached, so they are retried next start.
+    """
+    names = list(dict.fromkeys(names))
+    if timeout is None:
+        timeout = float(os.getenv("LAN_IP_TIMEOUT", "5"))
+    if cache_ttl is None:
+        cache_ttl = float(os.getenv("LAN_IP_CACHE_TTL", "600"))
+
+    cached = _read_discovery_cache(cache_path, cache_ttl) if cache_ttl > 0 else {}
+    results: Dict[str, Optional[str]] = {n: cached[n] for n in names if cached.get(n)}
+    missing = [n for n in names if n not in results]
+    if not missing:
+        return results
+
+    pool = ThreadPoolExecutor(max_workers=len(missing))
+    futures = {name: pool.submit(DISCOVERY_PROBES[name]) for name in missing}
+    deadline = time.monotonic() + timeout
+    found: Dict[str, str] = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except Exception:
+            results[name] = None
+        if results[name]:
+            found[name] = results[name]
+    # Do not wait for probes that timed out; their own subprocess timeouts end them.
+    pool.shutdown(wait=False)
+
+    if found and cache_ttl > 0:
+        _write_discovery_cache(cache_path, found)
+    return results
+
+
 # -------------------------
 # .env helpers
 # -------------------------
@@ -298,4 +387,5 @@ __all__ = [
     "get_wsl_ip",
     "ensure_portproxy",
     "ensure_firewall_port",
+    "discover_addresses",
 ]
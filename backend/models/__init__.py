@@ -1,5 +1,5 @@
 """Models package."""
 
-from .batch import Batch
+from .batch import Batch, BatchTombstone
 
-__all__ = ["Batch"]
+__all__ = ["Batch", "BatchTombstone"]
@@ -1,16 +1,57 @@
 """Database models for Freshness Tracker."""
 
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, DateTime, Index, Integer, String, text
 from sqlalchemy.sql import func
-from database import Base
+from database import Base, DayOrdinal
+
+# Next value of the change sequence shared by `batches` and `batch_tombstones`,
+# evaluated inside each INSERT/UPDATE. Both MAX() lookups are index seeks, and
+# SQLite's single writer makes the values increase in commit order, which is
+# what lets GET /batches/changes resume from the last sequence a client saw.
+# Other databases give no such guarantee (nor would a sequence, which numbers
+# at insert rather than commit time), so delta sync is SQLite-only there.
+NEXT_CHANGE_SEQ = text(
+    "(SELECT COALESCE(MAX(seq), 0) + 1 FROM ("
+    "SELECT MAX(change_seq) AS seq FROM batches "
+    "UNION ALL SELECT MAX(change_seq) FROM batch_tombstones))"
+)
 
 
 class Batch(Base):
     __tablename__ = "batches"
 
     id = Column(Integer, primary_key=True, index=True)
-    product = Column(String, index=True)
+    product = Column(String)
     batch_identifier = Column(String, unique=True, index=True)
-    butcher_date = Column(String)  # Store as YYYY-MM-DD
-    arrival_date = Column(String)  # Store as YYYY-MM-DD
+    butcher_date = Column(DayOrdinal, index=True)  # Stored as date.toordinal()
+    arrival_date = Column(DayOrdinal, index=True)  # Stored as date.toordinal()
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by the ORM on every UPDATE; feeds the ETags on batch reads.
+    version = Column(Integer, nullable=False, server_default="1")
+    # Position in the change feed; reassigned on every INSERT and UPDATE.
+    change_seq = Column(
+        Integer, index=True, default=NEXT_CHANGE_SEQ, onupdate=NEXT_CHANGE_SEQ
+    )
+
+    __table_args__ = (
+        # Per-product freshness stats: GROUP BY product over arrival dates,
+        # answered from this index alone. It also serves product lookups, so
+        # product has no index of its own.
+        Index("ix_batches_product_arrival_date", "product", "arrival_date"),
+        # Never reuse the id of a deleted batch: ETags, the change feed and
+        # the worker event tailer all take an id to mean one batch.
+        {"sqlite_autoincrement": True},
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+
+class BatchTombstone(Base):
+    """A deleted batch, kept so delta sync can tell clients to drop it."""
+
+    __tablename__ = "batch_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    change_seq = Column(Integer, nullable=False, index=True, default=NEXT_CHANGE_SEQ)
+    batch_id = Column(Integer, nullable=False)
+    batch_identifier = Column(String)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,8 +1,7 @@
 from sqlalchemy import Column, Integer, String, DateTime
 from datetime import datetime
-import hashlib
-import secrets
 from database import Base
+from passwords import check_password, hash_password
 
 
 class User(Base):
@@ -17,28 +16,11 @@ class User(Base):
 
     def set_password(self, password: str):
         """Hash and set the password."""
-        salt = secrets.token_hex(16)
-        password_hash = hashlib.pbkdf2_hmac(
-            "sha256",
-            password.encode("utf-8"),
-            salt.encode("utf-8"),
-            100000,
-        )
-        self.password_hash = f"{salt}${password_hash.hex()}"
+        self.password_hash = hash_password(password)
 
     def verify_password(self, password: str) -> bool:
         """Verify the password against the hash."""
-        try:
-            salt, hash_hex = self.password_hash.split("$")
-            password_hash = hashlib.pbkdf2_hmac(
-                "sha256",
-                password.encode("utf-8"),
-                salt.encode("utf-8"),
-                100000,
-            )
-            return password_hash.hex() == hash_hex
-        except (ValueError, AttributeError):
-            return False
+        return check_password(password, self.password_hash)
 
     def to_dict(self):
         return {
@@ -0,0 +1,150 @@
+"""Password hashing and a bounded process pool to run it off the event loop.
+
+PBKDF2 with 100k iterations costs tens of milliseconds of CPU per call. Hashing
+runs in a small dedicated process pool so a burst of logins queues there
+instead of competing with batch reads; once `PASSWORD_HASH_MAX_PENDING` jobs
+are waiting, further requests are rejected straight away.
+
+The hashing functions live in this dependency-free module so pool workers can
+import them cheaply. Workers are started with forkserver (spawn on Windows),
+never by forking the server, whose event loop and database threads a forked
+child would inherit mid-flight. If a worker dies, the broken pool is replaced
+and the affected requests get HasherBusyError instead of an error.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+PBKDF2_ITERATIONS = 100000
+START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def _pbkdf2(password: str, salt: str) -> str:
+    return hashlib.pbkdf2_hmac(
+        "sha256",
+        password.encode("utf-8"),
+        salt.encode("utf-8"),
+        PBKDF2_ITERATIONS,
+    ).hex()
+
+
+def hash_password(password: str) -> str:
+    """Return a "salt$hash" string for the password."""
+    salt = secrets.token_hex(16)
+    return f"{salt}${_pbkdf2(password, salt)}"
+
+
+def check_password(password: str, password_hash: Optional[str]) -> bool:
+    """Verify a password against a "salt$hash" string."""
+    try:
+        salt, hash_hex = password_hash.split("$")
+    except (ValueError, AttributeError):
+        return False
+    return hmac.compare_digest(_pbkdf2(password, salt), hash_hex)
+
+
+class HasherBusyError(RuntimeError):
+    """Raised when the hashing queue is full or a job timed out."""
+
+
+class PasswordHasher:
+    """Runs password hashing in a size-limited process pool with a bounded queue."""
+
+    def __init__(self, workers: int, max_pending: int, timeout: float):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    def start(self) -> None:
+        """Create the pool (startup hook); worker processes start on first use."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(START_METHOD),
+            )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        self.start()
+        return self._executor
+
+    def _replace_broken(self, executor: ProcessPoolExecutor) -> None:
+        # Concurrent jobs all see the same broken pool; replace it once.
+        if self._executor is executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self.restarts += 1
+            self.start()
+
+    async def _run(self, func: Callable, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HasherBusyError("Too many sign-in requests, try again shortly")
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        executor = self._get_executor()
+        try:
+            future = executor.submit(func, *args)
+            # Cancelling the wrapper on timeout also drops a job still queued.
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise HasherBusyError("Sign-in timed out, try again shortly")
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            raise HasherBusyError("Sign-in workers restarting, try again shortly")
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password in the pool."""
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, password_hash: Optional[str]) -> bool:
+        """Verify a password in the pool."""
+        return await self._run(check_password, password, password_hash)
+
+    def stats(self) -> dict:
+        """Queue depth and outcome counters for diagnostics."""
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "timeout_seconds": self.timeout,
+            "pending": self.pending,
+            "peak_pending": self.peak_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+            "start_method": START_METHOD,
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, if they were started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1)))),
+    max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32")),
+    timeout=float(os.getenv("PASSWORD_HASH_TIMEOUT", "10")),
+)
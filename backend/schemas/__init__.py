@@ -1,5 +1,27 @@
 """Schemas package."""
 
-from .batch import BatchBase, BatchCreate, Batch, BatchWithFreshness
+from .batch import (
+    BatchBase,
+    BatchCreate,
+    Batch,
+    BatchWithFreshness,
+    BulkBatchResult,
+    BulkBatchResponse,
+    BatchChange,
+    BatchChangesResponse,
+    ProductFreshnessStats,
+    FreshnessStatsResponse,
+)
 
-__all__ = ["BatchBase", "BatchCreate", "Batch", "BatchWithFreshness"]
+__all__ = [
+    "BatchBase",
+    "BatchCreate",
+    "Batch",
+    "BatchWithFreshness",
+    "BulkBatchResult",
+    "BulkBatchResponse",
+    "BatchChange",
+    "BatchChangesResponse",
+    "ProductFreshnessStats",
+    "FreshnessStatsResponse",
+]
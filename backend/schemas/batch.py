@@ -1,15 +1,15 @@
 """Pydantic schemas for request/response validation."""
 
 from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Optional
 
 
 class BatchBase(BaseModel):
     product: str
     batch_identifier: str
-    butcher_date: str  # YYYY-MM-DD format
-    arrival_date: str  # YYYY-MM-DD format
+    butcher_date: date  # YYYY-MM-DD format
+    arrival_date: date  # YYYY-MM-DD format
 
 
 class BatchCreate(BatchBase):
@@ -26,3 +26,48 @@ class Batch(BatchBase):
 
 class BatchWithFreshness(Batch):
     days_on_shelf: int
+
+
+class BulkBatchResult(BaseModel):
+    index: int
+    batch_identifier: str
+    status: str  # "created" or "conflict"
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class BulkBatchResponse(BaseModel):
+    created: int
+    conflicts: int
+    results: List[BulkBatchResult]
+
+
+class BatchChange(BaseModel):
+    seq: int
+    op: str  # "upsert" or "delete"
+    id: int
+    batch_identifier: Optional[str] = None
+    batch: Optional[Batch] = None  # the current row, for upserts
+
+
+class BatchChangesResponse(BaseModel):
+    changes: List[BatchChange]
+    next: str  # pass back as ?since= to resume after these changes
+    has_more: bool
+
+
+class ProductFreshnessStats(BaseModel):
+    product: Optional[str] = None
+    batches: int
+    min_days: Optional[int] = None
+    avg_days: Optional[float] = None
+    max_days: Optional[int] = None
+    fresh: int
+    aging: int
+    expired: int
+
+
+class FreshnessStatsResponse(BaseModel):
+    fresh_max_days: int  # fresh: days on shelf <= fresh_max_days
+    aging_max_days: int  # aging: up to aging_max_days; expired beyond
+    products: List[ProductFreshnessStats]
@@ -23,6 +23,15 @@ function AdminPortal() {
 
   useEffect(() => {
     fetchBatches();
+    // Live updates: apply created and deleted batches as they happen instead of
+    // re-downloading the list; "reset" means we missed events, so reload.
+    let events = null;
+    if (typeof EventSource !== "undefined") {
+      events = new EventSource(`${API_URL}/batches/stream`);
+      events.addEventListener("created", (e) => mergeBatches(JSON.parse(e.data)));
+      events.addEventListener("deleted", (e) => dropBatches(JSON.parse(e.data)));
+      events.addEventListener("reset", () => fetchBatches());
+    }
     // fetch dynamic public URL for QR codes
     axios
       .get(`${API_URL}/config/public`)
@@ -30,8 +39,22 @@ function AdminPortal() {
       .catch(() => {
         // ignore; will fall back to env/origin
       });
+    return () => events && events.close();
   }, []);
 
+  const mergeBatches = (incoming) => {
+    setBatches((current) => {
+      const byId = new Map(current.map((batch) => [batch.id, batch]));
+      incoming.forEach((batch) => byId.set(batch.id, batch));
+      return Array.from(byId.values()).sort((a, b) => a.id - b.id);
+    });
+  };
+
+  const dropBatches = (removed) => {
+    const ids = new Set(removed.map((batch) => batch.id));
+    setBatches((current) => current.filter((batch) => !ids.has(batch.id)));
+  };
+
   const fetchBatches = async () => {
     try {
       const response = await axios.get(`${API_URL}/batches/`);
@@ -49,7 +72,7 @@ function AdminPortal() {
     setSuccess(null);
 
     try {
-      await axios.post(`${API_URL}/batches/`, formData);
+      const response = await axios.post(`${API_URL}/batches/`, formData);
       setFormData({
         product: "Chicken",
         batch_identifier: "",
@@ -59,7 +82,8 @@ function AdminPortal() {
       setShowForm(false);
       setSuccess("Batch created successfully!");
       setTimeout(() => setSuccess(null), 3000);
-      fetchBatches();
+      // The stream delivers it too; merging by id makes that a no-op.
+      mergeBatches([response.data]);
     } catch (err) {
       setError(err.response?.data?.detail || "Failed to create batch");
     } finally {